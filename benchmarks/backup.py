@@ -0,0 +1,80 @@
+"""
+Cost of keeping one move cancellable: deep copy of the game state (former Game.do_backup) against
+GameState.snapshot, the copy kept for the game log, and the journal recording the move then undoing it
+(pandemic.game.history).
+
+    python benchmarks/backup.py [number_of_backups]
+"""
+import copy
+import csv
+import os
+import random
+import sys
+import timeit
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pandemic_back.settings")
+
+import django
+
+django.setup()
+
+from pandemic.game import history, players
+from pandemic.game.maps import MapIndex
+from pandemic.games import GameState
+from pandemic.models import PlayRoom
+from pandemic.models.cards_location import CardEvent
+from pandemic.models.playroom import PlayPhases
+
+
+def read_csv(name):
+    with open(os.path.join(BASE_DIR, 'pandemic_back', 'populates', name), newline='') as csvfile:
+        return list(csv.reader(csvfile, delimiter=',', quotechar='|'))
+
+
+def build_game_state():
+    locations = read_csv('locations.csv')
+    connections = read_csv('connections.csv')
+    game_state = GameState(PlayRoom(name='benchmark', has_started=True))
+    map_index = MapIndex({name: location_type for name, location_type, *_ in locations}, connections)
+    game_state.map_index = map_index
+
+    rng = random.Random(0)
+    cards = [*map_index.locations, *(event.value for event in CardEvent)]
+    rng.shuffle(cards)
+    game_state.players = ['p1', 'p2', 'p3', 'p4']
+    game_state.player_roles = {'p1': 'medecin', 'p2': 'expert', 'p3': 'scientifique', 'p4': 'specialiste'}
+    game_state.player_locations = [rng.randrange(map_index.n_locations) for _ in game_state.players]
+    game_state.player_hands = {player: [cards.pop() for _ in range(4)] for player in game_state.players}
+    game_state.location_deck = cards[:-8]
+    game_state.location_dump = cards[-8:]
+    game_state.infection_deck = list(map_index.locations[:-12])
+    game_state.infection_dump = list(map_index.locations[-12:])
+    game_state.locations_disease_count = bytearray(rng.choice((0, 0, 1, 2, 3))
+                                                   for _ in range(map_index.n_locations * map_index.n_diseases))
+    game_state.locations_research_center = 0b1011
+    game_state.research_center_count = 3
+    game_state.disease_status = ['ongoing'] * map_index.n_diseases
+    game_state.phase = PlayPhases.player_action.value
+    return game_state
+
+
+def journal_move(game_state, location):
+    history.start_journal(game_state, True)
+    players.set_player_location(game_state, 'p1', location)
+    history.undo(game_state, history.stop_journal(game_state))
+
+
+def main(number=2000):
+    game_state = build_game_state()
+    location = game_state.map_index.neighbors[game_state.player_locations[0]][0]
+    for name, backup in (('deepcopy', lambda: copy.deepcopy(game_state)),
+                         ('snapshot', game_state.snapshot),
+                         ('journal', lambda: journal_move(game_state, location))):
+        duration = min(timeit.repeat(backup, number=number, repeat=5))
+        print('{:<10} {:>10.1f} us/backup'.format(name, duration / number * 1e6))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,59 @@
+"""
+Encoding cost of one game_state broadcast to a room of 4 players and its spectators: the delta encoded
+by the sender then wrapped again by every receiving socket (former game_action), against a single frame
+shared by every socket (pandemic.frames), in JSON and in the compact encoding. Decoding is the cost
+for one client.
+
+    python benchmarks/broadcast.py [spectators] [number_of_broadcasts]
+"""
+import json
+import sys
+import timeit
+
+import msgpack
+
+from backup import build_game_state
+
+from pandemic.frames import CompactEncoder, encode_compact_frame, encode_frame
+from pandemic.game import players
+
+
+def nested_broadcast(message, recipients):
+    text = json.dumps(message)
+    return [json.dumps({'type': 'game_state', 'message': text}) for _ in range(recipients)]
+
+
+def shared_broadcast(message, recipients):
+    frame = encode_frame('game_state', message)
+    return [frame] * recipients
+
+
+def compact_broadcast(message, recipients, encoder):
+    frame = encode_compact_frame('game_state', encoder.encode_game_state(message))
+    return [frame] * recipients
+
+
+def main(spectators=20, number=2000):
+    game_state = build_game_state()
+    recipients = len(game_state.players) + spectators
+    players.set_player_location(game_state, 'p1', game_state.map_index.neighbors[game_state.player_locations[0]][0])
+    messages = (('delta', game_state.serialize_delta()), ('full state', game_state.serialize()))
+    print('{} players + {} spectators'.format(len(game_state.players), spectators))
+    encoder = CompactEncoder.for_map(game_state.map_index)
+    paths = (
+        ('nested', nested_broadcast, lambda frame: json.loads(json.loads(frame)['message'])),
+        ('shared', shared_broadcast, json.loads),
+        ('compact', lambda message, recipients: compact_broadcast(message, recipients, encoder), msgpack.unpackb),
+    )
+    for name, message in messages:
+        for path, broadcast, decode in paths:
+            duration = min(timeit.repeat(lambda: broadcast(message, recipients), number=number, repeat=5))
+            frame = broadcast(message, 1)[0]
+            decoding = min(timeit.repeat(lambda: decode(frame), number=number, repeat=5))
+            print('{:<10} {:<7} {:>10.1f} us/broadcast {:>7.1f} us/decode {:>7} bytes/frame'.format(
+                name, path, duration / number * 1e6, decoding / number * 1e6,
+                len(frame) if isinstance(frame, bytes) else len(frame.encode())))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
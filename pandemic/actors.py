@@ -0,0 +1,101 @@
+import asyncio
+import logging
+
+from pandemic import errors
+from pandemic.frames import frame_event
+from pandemic.games import GameState
+from pandemic_back import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RoomActor:
+    # the game commands of a room are played one at a time, in their arrival order, by a single task.
+    # The commands waiting when a batch starts are played together and the game changes of those
+    # to broadcast are sent to the room group in one message. The task ends once the inbox is empty.
+    actors = dict()
+    # rooms whose sockets missed a broadcast, they get the whole state with the next one
+    stale_rooms = set()
+
+    def __init__(self, room_name, room_group_name, channel_layer, full_state, encoder=None):
+        self.room_name = room_name
+        self.room_group_name = room_group_name
+        self.channel_layer = channel_layer
+        # coroutine function returning the serialized game state of the room
+        self.full_state = full_state
+        self.encoder = encoder
+        self.inbox = asyncio.Queue(maxsize=settings.GAME_ROOM_INBOX)
+        self.task = None
+
+    @classmethod
+    def get_actor(cls, room_name, room_group_name, channel_layer, full_state, encoder=None) -> 'RoomActor':
+        actor = cls.actors.get(room_name)
+        if actor is None:
+            actor = cls.actors[room_name] = cls(room_name, room_group_name, channel_layer, full_state, encoder)
+        return actor
+
+    def submit(self, play, broadcast=False) -> asyncio.Future:
+        # play: coroutine function playing the command, its result is broadcast as a game_state delta
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.inbox.put_nowait((play, broadcast, future))
+        except asyncio.QueueFull:
+            raise errors.RoomBusy
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+        return future
+
+    async def run(self):
+        try:
+            while not self.inbox.empty():
+                batch = [self.inbox.get_nowait()]
+                while len(batch) < settings.GAME_ROOM_BATCH and not self.inbox.empty():
+                    batch.append(self.inbox.get_nowait())
+                await self.play_batch(batch)
+        finally:
+            self.task = None
+            if not self.inbox.empty():
+                self.task = asyncio.ensure_future(self.run())
+            elif self.actors.get(self.room_name) is self:
+                del self.actors[self.room_name]
+
+    async def play_batch(self, batch):
+        results = []
+        deltas = []
+        for play, broadcast, future in batch:
+            try:
+                result = await play()
+            except Exception as e:
+                results.append((future, None, e))
+                continue
+            results.append((future, result, None))
+            if broadcast:
+                deltas.append(result)
+        if deltas:
+            await self.broadcast(deltas)
+            if self.room_name in self.stale_rooms:
+                # the whole state right away, or with the next broadcast if the channel layer is still down
+                await self.broadcast(deltas)
+        # the callers answer after the broadcast of every change played before theirs
+        for future, result, exception in results:
+            if future.cancelled():
+                continue
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+    async def broadcast(self, deltas):
+        try:
+            if self.room_name in self.stale_rooms:
+                game_state = await self.full_state()
+            else:
+                game_state = GameState.merge_deltas(deltas)
+            await self.channel_layer.group_send(
+                self.room_group_name, frame_event('game_state', game_state, self.encoder))
+        except Exception:
+            logger.exception("game changes of room %s not broadcast, the next broadcast sends the whole state",
+                             self.room_name)
+            self.stale_rooms.add(self.room_name)
+        else:
+            self.stale_rooms.discard(self.room_name)
@@ -0,0 +1,134 @@
+import json
+import re
+
+from pandemic import errors
+
+regex_command = re.compile(r"/([a-z]+)([^|]*)\|?(.*)")
+
+
+class Text:
+    # a string, empty when not given
+    __slots__ = ('name', 'max_length')
+
+    def __init__(self, name, max_length=64):
+        self.name = name
+        self.max_length = max_length
+
+    def from_slash(self, text):
+        return self.check(text)
+
+    def check(self, value):
+        if not isinstance(value, str) or len(value) > self.max_length:
+            raise errors.InvalidCommand
+        return value
+
+    def default(self):
+        return ''
+
+
+class TextList(Text):
+    # non empty strings joined by & in the slash syntax, a list required unless min_items is 0
+    __slots__ = ('min_items', 'max_items')
+
+    def __init__(self, name, max_length=64, min_items=0, max_items=8):
+        super().__init__(name, max_length)
+        self.min_items = min_items
+        self.max_items = max_items
+
+    def from_slash(self, text):
+        return self.check(text.split('&') if text else [])
+
+    def check(self, value):
+        if not isinstance(value, list) or not self.min_items <= len(value) <= self.max_items:
+            raise errors.InvalidCommand
+        items = [Text.check(self, item) for item in value]
+        if not all(items):
+            raise errors.InvalidCommand
+        return items
+
+    def default(self):
+        if self.min_items:
+            raise errors.InvalidCommand
+        return []
+
+
+class CommandSchema:
+    # arguments given to the handler of a command, the slash syntax gives the first two:
+    # /command first|second
+    __slots__ = ('name', 'fields', 'field_names')
+
+    def __init__(self, name, *fields):
+        self.name = name
+        self.fields = fields
+        self.field_names = frozenset(field.name for field in fields)
+
+    def parse_slash(self, first, second):
+        return tuple(field.from_slash(text) for field, text in zip(self.fields, (first, second)))
+
+    def parse_args(self, args):
+        if not isinstance(args, dict) or not self.field_names.issuperset(args):
+            raise errors.InvalidCommand
+        return tuple(field.check(args[field.name]) if field.name in args else field.default()
+                     for field in self.fields)
+
+
+def _action(name):
+    # the game actions get the two slash arguments as they are, see pandemic.game.actions
+    return CommandSchema(name, Text('first'), Text('second'))
+
+
+COMMANDS = {schema.name: schema for schema in (
+    CommandSchema('join', Text('name')),
+    CommandSchema('kick', Text('name')),
+    CommandSchema('rename', Text('name')),
+    CommandSchema('playroomstate'),
+    CommandSchema('gamesetup'),
+    CommandSchema('gamestate'),
+    CommandSchema('role', Text('role')),
+    CommandSchema('ready'),
+    CommandSchema('unready'),
+    CommandSchema('start'),
+    CommandSchema('cancel'),
+    _action('move'),
+    _action('heal'),
+    _action('end'),
+    _action('dump'),
+    _action('moveto'),
+    _action('movefrom'),
+    _action('build'),
+    _action('destroy'),
+    _action('movetoexpert'),
+    CommandSchema('cure', TextList('cards', min_items=1)),
+    CommandSchema('give', TextList('args', min_items=1)),
+    CommandSchema('playevent', Text('event'), TextList('args')),
+    CommandSchema('seenextinfections'),
+    CommandSchema('setnextinfections', Text('secret'), TextList('cards', min_items=1, max_items=6)),
+)}
+
+
+def parse_command(str_input):
+    r = re.search(regex_command, str_input)
+    if not r:
+        return None, ()
+    return r.group(1), (r.group(2).strip(), r.group(3).strip())
+
+
+def parse_message(text_data):
+    # "/command first|second" or {"command": "command", "args": {"name": value}}, checked against
+    # the schema of the command before it is handled
+    try:
+        message = json.loads(text_data)
+    except (TypeError, ValueError):
+        raise errors.InvalidCommand
+    if isinstance(message, str):
+        command, args = parse_command(message)
+        schema = COMMANDS.get(command)
+        if schema is None:
+            raise errors.InvalidCommand
+        return command, schema.parse_slash(*args)
+    if not isinstance(message, dict) or not isinstance(message.get('command'), str):
+        raise errors.InvalidCommand
+    schema = COMMANDS.get(message['command'])
+    if schema is None:
+        raise errors.InvalidCommand
+    return schema.name, schema.parse_args(message.get('args', {}))
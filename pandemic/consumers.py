@@ -1,123 +1,154 @@
+import contextlib
 import secrets
 
-from asgiref.sync import async_to_sync
 import json
 
+from channels.db import database_sync_to_async
+
 from pandemic import errors
-from pandemic.controller import maplocations, rooms
+from pandemic.actors import RoomActor
+from pandemic.commands import COMMANDS, parse_command, parse_message
+from pandemic.controller import maplocations
 from pandemic.controller.players import create_player, take_player, free_player, rename_player, \
     ready_player, check_start_game, choose_role, unready_player
 from pandemic.controller.rooms import create_room, start_game, get_player_status
+from pandemic.frames import COMPACT_SUBPROTOCOL, CompactEncoder, Outbox, batch_event, encode_compact_frame, \
+    encode_frame, frame_event, join_frames
 from pandemic.errors import TooManyPlayers, PlayerAlreadyExists, Error
 from pandemic.games import AllGames, Move, EndTurn, DumpCard, Heal, MoveToLocation, MoveFromLocation, \
     BuildResearchCenter, CureDisease, DestroyResearchCenter, GiveCard, MoveToLocationExpert, \
     get_event_class
+from pandemic.lobbies import WORKER, AllLobbies, Lobby, player_patch
+from pandemic.maps import AllMaps
 from pandemic.models import PlayRoom, Player
 from pandemic_back import settings
 
-from channels.generic.websocket import WebsocketConsumer
-import re
+from channels.generic.websocket import AsyncWebsocketConsumer
 
-regex_command = re.compile("/([a-z]+)([^|]*)\|?(.*)")
+# the game changes made by these commands are broadcast by the room actor
+BROADCAST_COMMANDS = {'register_action', 'cancel_last_action'}
 
 
 def game_action(func):
-    def wrapper(*args):
+    async def wrapper(*args):
         consumer = args[0]
         if consumer.player:
             try:
-                res = func(*args)
-                consumer.send_message_to_group('game_state', json.dumps(res))
+                await func(*args)
             except Error as e:
-                consumer.send_message_to_socket('error', str(e))
+                await consumer.send_message_to_socket('error', str(e))
 
     return wrapper
 
 
 def require_player(func):
-    def wrapper(*args):
+    async def wrapper(*args):
         consumer = args[0]
         if consumer.player:
             try:
-                return func(*args)
+                return await func(*args)
             except Error as e:
-                consumer.send_message_to_socket('error', str(e))
+                await consumer.send_message_to_socket('error', str(e))
 
     return wrapper
 
 
-def parse_command(str_input):
-    r = re.search(regex_command, str_input)
-    if not r:
-        return None, ()
-    return r.group(1), (r.group(2).strip(), r.group(3).strip())
-
+class JoinConsumer(AsyncWebsocketConsumer):
 
-class JoinConsumer(WebsocketConsumer):
-
-    def connect(self):
-        self.accept()
-        self.send(text_data=json.dumps({
+    async def connect(self):
+        await self.accept()
+        await self.send(text_data=json.dumps({
             "type": "info",
             "message": "Welcome ! Create a room with: /new"
         }))
 
-    def receive(self, text_data):
+    async def receive(self, text_data):
         command, args = parse_command(json.loads(text_data))
         if command == "new":
-            playroom = create_room()
-            self.send(text_data=json.dumps({
+            playroom = await database_sync_to_async(create_room)()
+            await self.send(text_data=json.dumps({
                 "type": "url",
                 "message": "/pandemic/{:}".format(playroom.name)
             }))
 
-    def disconnect(self, close_code):
+    async def disconnect(self, close_code):
         # Leave room group
         pass
 
 
-class PlayConsumer(WebsocketConsumer):
+class PlayConsumer(AsyncWebsocketConsumer):
+    # runs on the event loop: the database is only reached through database_sync_to_async,
+    # the commands of a room in memory are played without leaving the loop
 
-    def connect(self):
+    async def connect(self):
         self.secret = secrets.token_hex(4)
         self.username = None
         self.player = None
         self.playroom_id = None
+        self.compact = False
+        self.outbox = None
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = 'pandemic_%s' % self.room_name
-        if not PlayRoom.objects.filter(name=self.room_name).exists():
+        self.playroom = await database_sync_to_async(PlayRoom.objects.filter(name=self.room_name).first)()
+        if self.playroom is None:
             return
         self.username = "Anonymous"
-        self.playroom_id = PlayRoom.objects.get(name=self.room_name).id
+        self.playroom_id = self.playroom.id
+        loaded_map = await database_sync_to_async(AllMaps.get_map)(self.playroom.map_id)
+        self.encoder = CompactEncoder.for_map(loaded_map.map_index)
+        self.compact = COMPACT_SUBPROTOCOL in self.scope.get('subprotocols', ())
 
         # Join room group
-        async_to_sync(self.channel_layer.group_add)(
+        await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
-        self.accept()
-        self.send(text_data=json.dumps(
-            {
-                "type": "info",
-                "message": "Welcome {:} to room {:}".format(self.username, self.room_name)
-            }
-        ))
-
-    def receive(self, text_data):
-        print("in::", text_data)
-        command, args = parse_command(json.loads(text_data))
-        print("cmd::", command, args)
+        AllLobbies.connect(self.room_name)
+        await self.accept(COMPACT_SUBPROTOCOL if self.compact else None)
+        await self.send_message_to_socket("info", "Welcome {:} to room {:}".format(self.username, self.room_name))
 
-        if command:
-            method = getattr(self, 'handle_' + command, None)
-            if method:
-                method(*args)
+    async def receive(self, text_data=None, bytes_data=None):
+        # nothing reaches the database or the game before the command matches its schema
+        try:
+            command, args = parse_message(text_data if text_data is not None else bytes_data)
+        except Error as e:
+            await self.send_message_to_socket('error', str(e))
+            return
+        async with self.outbound_batch():
+            await self.handlers[command](self, *args)
+
+    async def dispatch(self, message):
+        # the frames given by one group message leave in one frame too
+        if message['type'].startswith('websocket.') or self.outbox is not None:
+            return await super().dispatch(message)
+        async with self.outbound_batch():
+            await super().dispatch(message)
+
+    @contextlib.asynccontextmanager
+    async def outbound_batch(self):
+        # the socket gets the messages of a command in one frame, and the room group in one group message
+        self.outbox = Outbox()
+        try:
+            yield
+        finally:
+            await self.flush()
+
+    async def flush(self):
+        outbox, self.outbox = self.outbox, None
+        if outbox.frames:
+            await self.send_frames(outbox.frames)
+        if outbox.group_events:
+            await self.channel_layer.group_send(self.room_group_name, batch_event(outbox.group_events))
+
+    async def send_to_group(self, event):
+        if self.outbox is not None:
+            self.outbox.group_events.append(event)
+        else:
+            await self.channel_layer.group_send(self.room_group_name, event)
 
-    def send_message_to_group(self, msg_type, message, **kwargs):
+    async def send_message_to_group(self, msg_type, message, **kwargs):
         # Send message to room group
-        # print(msg)
-        async_to_sync(self.channel_layer.group_send)(
-            self.room_group_name,
+        await self.send_to_group(
             {
                 'type': msg_type,
                 'message': message,
@@ -125,255 +156,286 @@ class PlayConsumer(WebsocketConsumer):
             }
         )
 
-    def send_message_to_socket(self, msg_type, message):
-        msg = {
-            'type': msg_type,
-            'message': message
-        }
-        print(msg)
-        self.send(json.dumps({
-            'type': msg_type,
-            'message': message
-        }))
+    async def broadcast(self, msg_type, message):
+        # same frame for every socket of the room, encoded once here
+        await self.send_to_group(frame_event(msg_type, message, self.encoder))
+
+    async def send_message_to_socket(self, msg_type, message):
+        if self.compact:
+            await self.send_frame(encode_compact_frame(msg_type, message))
+        else:
+            await self.send_frame(encode_frame(msg_type, message))
 
-    def disconnect(self, close_code):
+    async def send_frame(self, frame):
+        if self.outbox is not None:
+            self.outbox.frames.append(frame)
+        else:
+            await self.send_frames([frame])
+
+    async def send_frames(self, frames):
+        frame = join_frames(frames)
+        if isinstance(frame, bytes):
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
+
+    async def disconnect(self, close_code):
         # Leave room group
         if self.player:
-            playroom = self.get_playroom()
-            free_player(playroom, self.player.name)
-            self.send_message_to_group("info", "Player {:} has left".format(self.player.name))
-            self.handle_playroomstate()
-        async_to_sync(self.channel_layer.group_discard)(
+            async with self.outbound_batch():
+                playroom = await self.get_playroom()
+                patch = (await self.get_lobby()).free_player_patch(self.player.name)
+                await database_sync_to_async(free_player)(playroom, self.player.name)
+                await self.broadcast('info', "Player {:} has left".format(self.player.name))
+                await self.change_lobby(patch)
+        await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
+        if self.playroom_id is not None:
+            AllLobbies.disconnect(self.room_name)
+
+    async def get_playroom(self):
+        # loaded at connect, and loaded again only after a playroom_changed event
+        if self.playroom is None:
+            self.playroom = await database_sync_to_async(PlayRoom.objects.get)(id=self.playroom_id)
+        return self.playroom
+
+    async def get_lobby(self) -> Lobby:
+        lobby = AllLobbies.get_lobby(self.room_name)
+        if lobby is None:
+            playroom = await self.get_playroom()
+            lobby = await database_sync_to_async(AllLobbies.load_lobby)(playroom)
+        return lobby
+
+    async def change_lobby(self, patch):
+        # the players are changed in the database first
+        lobby = await self.get_lobby()
+        lobby.apply(patch)
+        await self.send_to_group(lobby.event(patch, self.encoder))
+
+    async def play(self, command, *args):
+        # the commands of a room are played in order by its actor
+        actor = RoomActor.get_actor(self.room_name, self.room_group_name, self.channel_layer,
+                                    lambda: self.play_now('get_game_state'), self.encoder)
+        return await actor.submit(lambda: self.play_now(command, *args), command in BROADCAST_COMMANDS)
+
+    async def play_now(self, command, *args):
+        # a room in memory is played on the event loop and only its log is written in a thread,
+        # the other rooms are loaded (or synchronised with the shared store) in a thread first
+        game = AllGames.acquire_resident_game(self.room_name)
+        if game is None:
+            return await database_sync_to_async(self.play_in_thread)(command, *args)
+        try:
+            return getattr(game, command)(*args)
+        finally:
+            unwritten = AllGames.release_resident_game(self.room_name, game)
+            if unwritten:
+                await database_sync_to_async(AllGames.write_log)(game, unwritten)
 
-    def get_playroom(self):
-        return PlayRoom.objects.get(id=self.playroom_id)
+    def play_in_thread(self, command, *args):
+        if self.playroom is None or not self.playroom.has_started:
+            self.playroom = PlayRoom.objects.get(id=self.playroom_id)
+        return getattr(AllGames, command)(self.playroom, *args)
 
     ### solve actions
-    def handle_join(self, arg1=None, arg2=None):
+    async def handle_join(self, arg1=None, arg2=None):
         playername = arg1
         if not playername:
             return
         self.username = playername
-        playroom = self.get_playroom()
+        playroom = await self.get_playroom()
 
         try:
             if self.player:
-                free_player(playroom, self.player.name)
-            self.player = take_player(playername, playroom)
-            self.send_message_to_socket('info', "You joined the game as {:}".format(self.player.name))
-            self.send_message_to_group('info', "Player {:} joined the game".format(self.player.name))
-            self.handle_playroomstate()
+                patch = (await self.get_lobby()).free_player_patch(self.player.name)
+                await database_sync_to_async(free_player)(playroom, self.player.name)
+                await self.change_lobby(patch)
+            self.player = await database_sync_to_async(take_player)(playername, playroom, self.channel_name)
+            await self.send_message_to_socket('info', "You joined the game as {:}".format(self.player.name))
+            await self.broadcast('info', "Player {:} joined the game".format(self.player.name))
+            await self.change_lobby(player_patch(self.player))
             if playroom.has_started:
-                self.handle_gamestate()
+                await self.handle_gamestate()
 
         except Player.DoesNotExist:
             if not playroom.has_started:
-                self._handle_add_player()
-                self.handle_playroomstate()
+                await self._handle_add_player()
         except Error as e:
-            self.send_message_to_socket('error', str(e))
+            await self.send_message_to_socket('error', str(e))
 
-    def _handle_add_player(self):
+    async def _handle_add_player(self):
         try:
-            playroom = self.get_playroom()
-            self.player = create_player(self.username, playroom)
-            self.send_message_to_socket('info', "You joined the game as {:}".format(self.player.name))
-            self.send_message_to_group('info', "Player {:} joined the game".format(self.player.name))
+            playroom = await self.get_playroom()
+            self.player = await database_sync_to_async(create_player)(self.username, playroom, self.channel_name)
+            await self.send_message_to_socket('info', "You joined the game as {:}".format(self.player.name))
+            await self.broadcast('info', "Player {:} joined the game".format(self.player.name))
+            await self.change_lobby(player_patch(self.player))
         except (TooManyPlayers, PlayerAlreadyExists) as e:
-            self.send_message_to_socket('error', str(e))
+            await self.send_message_to_socket('error', str(e))
 
-    def handle_kick(self, arg1=None, arg2=None):
+    async def handle_kick(self, arg1=None, arg2=None):
         player_name = arg1
         if player_name:
             try:
-                playroom = self.get_playroom()
-                free_player(playroom, player_name)
-                self.send_message_to_socket('info', "You kicked the game as {:}".format(player_name))
-                self.send_message_to_group('player_kicked', "Player {:} was kicked".format(player_name),
-                                           playername=player_name)
-                self.handle_playroomstate()
+                playroom = await self.get_playroom()
+                patch = (await self.get_lobby()).free_player_patch(player_name)
+                channel_name = await database_sync_to_async(free_player)(playroom, player_name)
+                await self.send_message_to_socket('info', "You kicked the game as {:}".format(player_name))
+                if channel_name:
+                    await self.channel_layer.send(channel_name, {'type': 'player_kicked', 'playername': player_name})
+                await self.broadcast('info', "Player {:} was kicked".format(player_name))
+                await self.change_lobby(patch)
             except Player.DoesNotExist as e:
-                self.send_message_to_socket("error", str(e))
+                await self.send_message_to_socket("error", str(e))
 
-    def handle_rename(self, *args):
+    async def handle_rename(self, *args):
         if self.player:
             old_player_name = self.username
-            self.send_message_to_socket('info', 'Your username was changed to {:}'.format(self.username))
+            await self.send_message_to_socket('info', 'Your username was changed to {:}'.format(self.username))
             try:
-                playroom = self.get_playroom()
-                rename_player(self.player, self.username, playroom)
+                playroom = await self.get_playroom()
+                previous_name = self.player.name
+                await database_sync_to_async(rename_player)(self.player, self.username, playroom)
                 self.username = args[0] if args[0] else 'Anonymous'
-                self.send_message_to_group('info',
-                                           "Player {:} was renamed to {:}".format(old_player_name, self.player.name))
+                await self.broadcast('info', "Player {:} was renamed to {:}".format(old_player_name,
+                                                                                   self.player.name))
+                if previous_name != self.player.name:
+                    patch = player_patch(self.player)
+                    patch['players'] = {previous_name: None, **patch['players']}
+                    await self.change_lobby(patch)
             except Error as e:
-                self.send_message_to_socket('error', str(e))
+                await self.send_message_to_socket('error', str(e))
         else:
             self.username = args[0] if args[0] else 'Anonymous'
 
-    def handle_playroomstate(self, *args):
-        playroom = self.get_playroom()
-        playroom_state = rooms.get_playroom_state(playroom)
-        self.send_message_to_group('playroomstate', playroom_state)
+    async def handle_playroomstate(self, *args):
+        lobby = await self.get_lobby()
+        await self.send_to_group(lobby.event(encoder=self.encoder))
 
-    def handle_gamesetup(self, *args):
-        playroom = self.get_playroom()
-        dict_all_locations = maplocations.get_all_locations(playroom)
-        self.send_message_to_socket('game_setup', json.dumps({
-            "locations": dict_all_locations,
-        }))
+    async def handle_gamesetup(self, *args):
+        playroom = await self.get_playroom()
+        dict_all_locations = await database_sync_to_async(maplocations.get_all_locations)(playroom)
+        game_setup = {"locations": dict_all_locations}
+        if self.compact:
+            game_setup["dictionary"] = self.encoder.dictionary
+        await self.send_message_to_socket('game_setup', game_setup)
 
     # def handle_locations_network(self, *args):
     #     all_locations = maplocations.get_locations_network(self.playroom_id)
     #     self.send_message_to_socket('game_setup', json.dumps(all_locations))
 
-    def handle_gamestate(self, *args):
-        playroom = self.get_playroom()
-        game_state = AllGames.get_game_state(playroom)
-        self.send_message_to_group('game_state', json.dumps(game_state))
+    async def handle_gamestate(self, *args):
+        try:
+            game_state = await self.play('get_game_state')
+        except Error as e:
+            await self.send_message_to_socket('error', str(e))
+            return
+        await self.broadcast('game_state', game_state)
 
     @require_player
-    def handle_role(self, *args):
-        choose_role(self.player, args[0])
-        self.handle_playroomstate()
-        self.send_message_to_group('info', "Player {:} is now {:}".format(self.player.name, self.player.role))
+    async def handle_role(self, *args):
+        await database_sync_to_async(choose_role)(self.player, args[0])
+        await self.change_lobby(player_patch(self.player))
+        await self.broadcast('info', "Player {:} is now {:}".format(self.player.name, self.player.role))
 
     @require_player
-    def handle_ready(self, *args):
-        ready_player(self.player)
-        self.handle_playroomstate()
-        self.send_message_to_group('info', "Player {:} is ready.".format(self.player.name))
+    async def handle_ready(self, *args):
+        await database_sync_to_async(ready_player)(self.player)
+        await self.change_lobby(player_patch(self.player))
+        await self.broadcast('info', "Player {:} is ready.".format(self.player.name))
 
     @require_player
-    def handle_unready(self, *args):
-        unready_player(self.player)
-        self.handle_playroomstate()
-        self.send_message_to_group('info', "Player {:} not ready.".format(self.player.name))
+    async def handle_unready(self, *args):
+        await database_sync_to_async(unready_player)(self.player)
+        await self.change_lobby(player_patch(self.player))
+        await self.broadcast('info', "Player {:} not ready.".format(self.player.name))
 
     @require_player
-    def handle_start(self, *args):
-        playroom = self.get_playroom()
-        check_start_game(playroom)
-        self.send_message_to_group('info', "THE PANDEMIC HAS STARTED !")
-        game_state = start_game(playroom)
-        self.handle_playroomstate()
-        self.send_message_to_group('game_state', json.dumps(game_state))
+    async def handle_start(self, *args):
+        playroom = await self.get_playroom()
+        await database_sync_to_async(check_start_game)(playroom)
+        await self.broadcast('info', "THE PANDEMIC HAS STARTED !")
+        game_state = await database_sync_to_async(start_game)(playroom)
+        await self.send_message_to_group('playroom_changed', None)
+        await self.change_lobby({'has_started': True})
+        await self.broadcast('game_state', game_state)
 
     @game_action
-    def handle_cancel(self, *args):
-        print("handle_cancel", args)
-        playroom = self.get_playroom()
-        return AllGames.cancel_last_action(playroom, self.player)
+    async def handle_cancel(self, *args):
+        return await self.play('cancel_last_action', self.player)
 
     @game_action
-    def handle_move(self, *args):
-        print("handle_move", args)
-        playroom = self.get_playroom()
-        return AllGames.register_action(playroom, self.player, Move(*args))
+    async def handle_move(self, *args):
+        return await self.play('register_action', self.player, Move(*args))
 
     @game_action
-    def handle_heal(self, *args):
-        print("handle_move", args)
-        playroom = self.get_playroom()
-        return AllGames.register_action(playroom, self.player, Heal(*args))
+    async def handle_heal(self, *args):
+        return await self.play('register_action', self.player, Heal(*args))
 
     @game_action
-    def handle_end(self, *args):
-        print("handle_end", args)
-        playroom = self.get_playroom()
-        return AllGames.register_action(playroom, self.player, EndTurn(*args))
+    async def handle_end(self, *args):
+        return await self.play('register_action', self.player, EndTurn(*args))
 
     @game_action
-    def handle_dump(self, *args):
-        print("handle_dump", args)
-        playroom = self.get_playroom()
-        return AllGames.register_action(playroom, self.player, DumpCard(*args))
+    async def handle_dump(self, *args):
+        return await self.play('register_action', self.player, DumpCard(*args))
 
     @game_action
-    def handle_moveto(self, *args):
-        print("handle_moveto", args)
-        playroom = self.get_playroom()
-        return AllGames.register_action(playroom, self.player, MoveToLocation(*args))
+    async def handle_moveto(self, *args):
+        return await self.play('register_action', self.player, MoveToLocation(*args))
 
     @game_action
-    def handle_movefrom(self, *args):
-        print("handle_movefrom", args)
-        playroom = self.get_playroom()
-        return AllGames.register_action(playroom, self.player, MoveFromLocation(*args))
+    async def handle_movefrom(self, *args):
+        return await self.play('register_action', self.player, MoveFromLocation(*args))
 
     @game_action
-    def handle_build(self, *args):
-        print("handle_build", args)
-        playroom = self.get_playroom()
-        return AllGames.register_action(playroom, self.player, BuildResearchCenter(*args))
+    async def handle_build(self, *args):
+        return await self.play('register_action', self.player, BuildResearchCenter(*args))
 
     @game_action
-    def handle_destroy(self, *args):
-        print("handle_build", args)
-        playroom = self.get_playroom()
-        return AllGames.register_action(playroom, self.player, DestroyResearchCenter(*args))
+    async def handle_destroy(self, *args):
+        return await self.play('register_action', self.player, DestroyResearchCenter(*args))
 
     @game_action
-    def handle_cure(self, *args):
-        print("handle_cure", args)
-        playroom = self.get_playroom()
-        args = str(args[0]).split('&')
-        return AllGames.register_action(playroom, self.player, CureDisease(*args))
+    async def handle_cure(self, cards):
+        return await self.play('register_action', self.player, CureDisease(*cards))
 
     @game_action
-    def handle_give(self, *args):
-        print("handle_give", args)
-        playroom = self.get_playroom()
-        args = str(args[0]).split('&')
-        return AllGames.register_action(playroom, self.player, GiveCard(*args))
+    async def handle_give(self, args):
+        return await self.play('register_action', self.player, GiveCard(*args))
 
     @game_action
-    def handle_movetoexpert(self, *args):
-        print("handle_movetoexpert", args)
-        playroom = self.get_playroom()
-        return AllGames.register_action(playroom, self.player, MoveToLocationExpert(*args))
+    async def handle_movetoexpert(self, *args):
+        return await self.play('register_action', self.player, MoveToLocationExpert(*args))
 
     @game_action
-    def handle_playevent(self, *args):
-        print("handle_playevent", args)
-        playroom = self.get_playroom()
-        event_type = args[0]
+    async def handle_playevent(self, event_type, event_args):
         event_class = get_event_class(event_type)
-        event_args = str(args[1]).split("&")
-        return AllGames.register_action(playroom, self.player, event_class(*event_args))
+        return await self.play('register_action', self.player, event_class(*event_args))
 
-    def handle_seenextinfections(self, *args):
-        print("handle_seenextinfections", args)
-        playroom = self.get_playroom()
+    async def handle_seenextinfections(self, *args):
         try:
-            nextinfections = AllGames.get_next_infections(playroom, self.player, n=6)
-            self.send_message_to_group('cardList', {
+            nextinfections = await self.play('get_next_infections', self.player, 6, True)
+            await self.send_message_to_socket('cardList', {
                 "type": "infections",
                 "cards": nextinfections,
-            }, playername=self.player.name)
+                "secret": self.new_secret(),
+            })
         except Error as e:
-            self.send_message_to_socket('error', str(e))
-
-    def handle_setnextinfections(self, *args):
-        print("handle_setnextinfections", args)
-        playroom = self.get_playroom()
-        secret = args[0]
-        cards = args[1].split('&')
+            await self.send_message_to_socket('error', str(e))
 
+    async def handle_setnextinfections(self, secret, cards):
         try:
             self.check_secret(secret)
-            dict_change = AllGames.set_next_infections(playroom, self.player, cards)
-            self.send_message_to_group('cardList', {
+            dict_change = await self.play('set_next_infections', self.player, cards)
+            await self.send_message_to_group('cardList', {
                 "type": "infections",
                 "cards": cards,
-            }, playername=None)
-            self.send_message_to_group('game_state', json.dumps(dict_change))
+            })
+            await self.broadcast('game_state', dict_change)
         except Error as e:
-            self.send_message_to_socket('error', str(e))
-        except AttributeError as e:
-            self.send_message_to_socket('error', 'cartes invalides')
+            await self.send_message_to_socket('error', str(e))
 
     def new_secret(self):
         self.secret = secrets.token_hex(4)
@@ -387,35 +449,41 @@ class PlayConsumer(WebsocketConsumer):
 
     ## receiver for group messages
 
-    def error(self, event):
-        self.send_message_to_socket('error', event['message'])
+    async def error(self, event):
+        await self.send_message_to_socket('error', event['message'])
 
-    def info(self, event):
-        self.send_message_to_socket('info', event['message'])
+    async def playroomstate(self, event):
+        lobby = AllLobbies.get_lobby(self.room_name)
+        if lobby is not None and event['patch'] and event['worker'] != WORKER:
+            lobby.apply_remote(event['patch'], event['version'], event['worker'])
+        await self.send_frame(event['bytes'] if self.compact else event['text'])
+        await self.send_message_to_socket('player_status', {
+            'version': event['version'],
+            'player': get_player_status(self.player),
+        })
 
-    def playroomstate(self, event):
-        message = event['message']
-        selfplayer_status = get_player_status(self.player)
-        message["player"] = selfplayer_status
-        self.send_message_to_socket('playroomstate', json.dumps(message))
+    async def playroom_changed(self, event):
+        self.playroom = None
 
-    def game_state(self, event):
-        self.send_message_to_socket('game_state', event['message'])
+    async def frame(self, event):
+        await self.send_frame(event['bytes'] if self.compact else event['text'])
 
-    def game_setup(self, event):
-        self.send_message_to_socket('game_setup', event['message'])
+    async def batch(self, event):
+        for item in event['events']:
+            await getattr(self, item['type'])(item)
 
-    def player_kicked(self, event):
-        playername = event.get('playername')
-        if self.player and self.player.name == playername:
+    async def game_setup(self, event):
+        await self.send_message_to_socket('game_setup', event['message'])
+
+    async def player_kicked(self, event):
+        # sent to the channel of the kicked player only, it may have joined as someone else since
+        if self.player and self.player.name == event['playername']:
             self.player = None
-            self.send_message_to_socket("info", "You were kicked out.")
-        else:
-            return self.send_message_to_socket('info', event['message'])
-
-    def cardList(self, event):
-        playername = event.get('playername')
-        msg = event['message']
-        if self.player and self.player.name == playername:
-            msg['secret'] = self.new_secret()
-        self.send_message_to_socket("cardList", json.dumps(msg))
+            await self.send_message_to_socket("info", "You were kicked out.")
+
+    async def cardList(self, event):
+        await self.send_message_to_socket("cardList", event['message'])
+
+
+# dispatch table of the commands, every schema has its handler
+PlayConsumer.handlers = {command: getattr(PlayConsumer, 'handle_' + command) for command in COMMANDS}
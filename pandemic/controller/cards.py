@@ -3,25 +3,25 @@ from collections import defaultdict
 from typing import List, Dict
 
 from pandemic.controller.utils import get_card_id, get_player_id
+from pandemic.maps import AllMaps
 from pandemic.models import Player
 from pandemic.models.cards_infection import CardInfection
 from pandemic.models.cards_location import CardLocation, CardPosition, CardType
 from pandemic.models.cards_location_deck import CardsLocationDeck
-from pandemic.models.maplocation import MapLocation
 
 
-def initial_location_cards_setup(playroom):
+def initial_location_cards_setup(playroom, rng: random.Random):
     CardLocation.objects.filter(playroom=playroom).delete()
     all_players = Player.objects.filter(playroom=playroom)
     all_location_cards = [card for card in
                           CardsLocationDeck.objects.filter(type=CardType.location.value).filter(
-                              location__map=playroom.map)]
+                              location__map_id=playroom.map_id)]
     all_events_cards = [card for card in CardsLocationDeck.objects.filter(type=CardType.event.value)]
     card_epidemic = CardsLocationDeck.objects.get(type=CardType.epidemic.value)
     all_deck_cards = [*all_events_cards, *all_location_cards]
     all_playroom_cards = []
     # shuffte the cards
-    random.shuffle(all_deck_cards)
+    rng.shuffle(all_deck_cards)
 
     # give cards to players
     player_count = all_players.count()
@@ -37,7 +37,7 @@ def initial_location_cards_setup(playroom):
     deck_cards = all_deck_cards[player_count * card_per_player:]
     epidemic_number = 5
     subdeck_size = (53 - player_count * card_per_player) // epidemic_number
-    list_int_epidemic_pos = [i * subdeck_size + random.randrange(0, subdeck_size) for i in range(0, epidemic_number)]
+    list_int_epidemic_pos = [i * subdeck_size + rng.randrange(0, subdeck_size) for i in range(0, epidemic_number)]
     list_int_epidemic_pos.reverse()
     order = 0
     for card in deck_cards:
@@ -50,14 +50,16 @@ def initial_location_cards_setup(playroom):
     CardLocation.objects.bulk_create(all_playroom_cards)
 
 
-def initial_infection_cards_setup(playroom):
+def initial_infection_cards_setup(playroom, rng: random.Random):
     CardInfection.objects.filter(playroom=playroom).delete()
 
-    all_locations = [loc for loc in MapLocation.objects.filter(map=playroom.map)]
-    random.shuffle(all_locations)
+    loaded_map = AllMaps.get_map(playroom.map_id)
+    all_locations = list(zip(loaded_map.map_index.locations, loaded_map.location_pks))
+    rng.shuffle(all_locations)
     all_playroom_infection = []
-    for order, loc in enumerate(all_locations):
-        all_playroom_infection.append(CardInfection(playroom=playroom, name=loc.name, location=loc, order=order))
+    for order, (name, location_pk) in enumerate(all_locations):
+        all_playroom_infection.append(CardInfection(playroom=playroom, name=name, location_id=location_pk,
+                                                    order=order))
     CardInfection.objects.bulk_create(all_playroom_infection)
 
 
@@ -70,9 +72,9 @@ def draw_infections(playroom, infection_number: int) -> List[CardInfection]:
     return draw_cards
 
 
-def reload_infection_dump(playroom):
+def reload_infection_dump(playroom, rng: random.Random):
     dumped_cards = [c for c in CardInfection.objects.filter(playroom=playroom, position=CardPosition.dump.value).all()]
-    random.shuffle(dumped_cards)
+    rng.shuffle(dumped_cards)
     for idx, card in enumerate(dumped_cards):
         card.position = CardPosition.deck.value
         card.order = idx
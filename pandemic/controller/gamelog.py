@@ -0,0 +1,44 @@
+import json
+from typing import List, Tuple, Dict
+
+from django.db.models import Max, OuterRef, Subquery
+
+from pandemic.models import GameLogEntry, GameSnapshot
+
+
+def clear_game_log(playroom):
+    GameLogEntry.objects.filter(playroom=playroom).delete()
+    GameSnapshot.objects.filter(playroom=playroom).delete()
+
+
+def append_log_entries(playroom, entries):
+    GameLogEntry.objects.bulk_create([
+        GameLogEntry(playroom=playroom, index=index, player=player, command=command, args=json.dumps(args))
+        for index, player, command, args in entries
+    ])
+
+
+def save_snapshot(playroom, log_index, state: str):
+    GameSnapshot.objects.create(playroom=playroom, log_index=log_index, state=state)
+    GameSnapshot.objects.filter(playroom=playroom, log_index__lt=log_index).delete()
+
+
+def get_saved_games(playroom_ids) -> Dict[int, Tuple[int, Dict, List[Tuple[int, str, str, List]]]]:
+    # latest snapshot of each room and the log entries written after it, in two queries whatever the rooms
+    saved_games = {}
+    for playroom_id, log_index, state in GameSnapshot.objects.filter(playroom_id__in=playroom_ids) \
+            .values_list('playroom_id', 'log_index', 'state'):
+        saved_games[playroom_id] = (log_index, json.loads(state), [])
+    latest_snapshot = GameSnapshot.objects.filter(playroom=OuterRef('playroom')).order_by('-log_index')
+    entries = GameLogEntry.objects.filter(playroom_id__in=saved_games,
+                                          index__gte=Subquery(latest_snapshot.values('log_index')[:1])) \
+        .values_list('playroom_id', 'index', 'player', 'command', 'args')
+    for playroom_id, index, player, command, args in entries:
+        saved_games[playroom_id][2].append((index, player, command, json.loads(args)))
+    return saved_games
+
+
+def get_recent_playroom_ids(n) -> List[int]:
+    # log entries are only appended, the highest ids are the last played rooms
+    return list(GameLogEntry.objects.filter(playroom__has_started=True).values('playroom_id')
+                .annotate(last_entry=Max('id')).order_by('-last_entry').values_list('playroom_id', flat=True)[:n])
@@ -0,0 +1,145 @@
+from collections import defaultdict
+from typing import Dict, List
+
+from django.db import transaction
+
+from pandemic.enums import CardPosition
+from pandemic.maps import AllMaps
+from pandemic.models import CardInfection, CardLocation, Disease, DiseaseStatus, MapState, Player, PlayRoom
+
+UPDATE_FIELDS = {
+    CardLocation: ('position', 'order', 'player'),
+    CardInfection: ('position', 'order'),
+    MapState: ('research_center',),
+    Disease: ('disease_count',),
+    DiseaseStatus: ('disease_status',),
+    Player: ('location', 'order'),
+    PlayRoom: ('outbreaks', 'epidemics', 'phase', 'epidemics_to_solve', 'player_actions', 'current_player',
+               'nuit_tranquille'),
+}
+
+
+class RoomRows:
+    # primary keys of the rows of a started room, and the values last written to each of them
+    __slots__ = ('playroom_id', 'location_cards', 'infection_cards', 'map_states', 'diseases', 'disease_status',
+                 'players', 'written')
+
+    def __init__(self, playroom_id):
+        self.playroom_id = playroom_id
+        self.location_cards = defaultdict(list)
+        self.infection_cards = {}
+        self.map_states = {}
+        self.diseases = {}
+        self.disease_status = {}
+        self.players = {}
+        self.written = defaultdict(dict)
+
+
+def _values_list(model, filters, *keys):
+    attnames = [model._meta.get_field(field).attname for field in UPDATE_FIELDS[model]]
+    for row in model.objects.filter(**filters).values_list(*keys, 'pk', *attnames):
+        yield row[:len(keys)], row[len(keys)], tuple(row[len(keys) + 1:])
+
+
+def load_room_rows(playroom_id) -> RoomRows:
+    rows = RoomRows(playroom_id)
+    written = rows.written
+    for (name,), pk, values in _values_list(CardLocation, {'playroom_id': playroom_id}, 'card__name'):
+        rows.location_cards[name].append(pk)
+        written[CardLocation][pk] = values
+    for (name,), pk, values in _values_list(CardInfection, {'playroom_id': playroom_id}, 'name'):
+        rows.infection_cards[name] = pk
+        written[CardInfection][pk] = values
+    for (location_pk,), pk, values in _values_list(MapState, {'playroom_id': playroom_id}, 'location_id'):
+        rows.map_states[location_pk] = pk
+        written[MapState][pk] = values
+    load_disease_rows(rows)
+    for (disease_type,), pk, values in _values_list(DiseaseStatus, {'playroom_id': playroom_id}, 'disease_type'):
+        rows.disease_status[disease_type] = pk
+        written[DiseaseStatus][pk] = values
+    for (name,), pk, values in _values_list(Player, {'playroom_id': playroom_id}, 'name'):
+        rows.players[name] = pk
+        written[Player][pk] = values
+    for _, pk, values in _values_list(PlayRoom, {'pk': playroom_id}):
+        written[PlayRoom][pk] = values
+    return rows
+
+
+def load_disease_rows(rows: RoomRows):
+    filters = {'map_state__playroom_id': rows.playroom_id}
+    for key, pk, values in _values_list(Disease, filters, 'map_state_id', 'disease_type'):
+        rows.diseases[key] = pk
+        rows.written[Disease][pk] = values
+
+
+def room_changes(rows: RoomRows, state: Dict, changes: Dict[type, List]) -> List[Disease]:
+    # state is captured by GameFlusher.capture, only rows whose values differ from the last write are kept
+    loaded_map = AllMaps.get_map(state['map_id'])
+    map_index = loaded_map.map_index
+
+    def update(model, pk, *values):
+        if pk is not None and rows.written[model].get(pk) != values:
+            rows.written[model][pk] = values
+            obj = model(pk=pk)
+            for field, value in zip(UPDATE_FIELDS[model], values):
+                setattr(obj, model._meta.get_field(field).attname, value)
+            changes[model].append(obj)
+
+    location_cards = {name: list(pks) for name, pks in rows.location_cards.items()}
+    for player, hand in state['player_hands'].items():
+        for order, card in enumerate(hand, -len(hand)):
+            update(CardLocation, _pop(location_cards, card), CardPosition.hand.value, order,
+                   rows.players.get(player))
+    for position, cards in ((CardPosition.deck.value, state['location_deck']),
+                            (CardPosition.dump.value, state['location_dump'])):
+        for order, card in enumerate(cards):
+            update(CardLocation, _pop(location_cards, card), position, order, None)
+    for pks in location_cards.values():
+        for pk in pks:
+            update(CardLocation, pk, CardPosition.removed.value, *rows.written[CardLocation][pk][1:])
+
+    infection_cards = dict(rows.infection_cards)
+    for position, cards in ((CardPosition.deck.value, state['infection_deck']),
+                            (CardPosition.dump.value, state['infection_dump'])):
+        for order, card in enumerate(cards):
+            update(CardInfection, infection_cards.pop(card, None), position, order)
+    for pk in infection_cards.values():
+        update(CardInfection, pk, CardPosition.removed.value, *rows.written[CardInfection][pk][1:])
+
+    created = []
+    n_diseases = map_index.n_diseases
+    for location, location_pk in enumerate(loaded_map.location_pks):
+        map_state_pk = rows.map_states.get(location_pk)
+        update(MapState, map_state_pk, bool(state['locations_research_center'] >> location & 1))
+        for disease_type, disease in enumerate(map_index.diseases):
+            count = state['locations_disease_count'][location * n_diseases + disease_type]
+            pk = rows.diseases.get((map_state_pk, disease))
+            if pk is None and count and map_state_pk is not None:
+                created.append(Disease(map_state_id=map_state_pk, disease_type=disease, disease_count=count))
+            update(Disease, pk, count)
+
+    for disease, status in zip(map_index.diseases, state['disease_status']):
+        update(DiseaseStatus, rows.disease_status.get(disease), status)
+    for order, (player, location) in enumerate(zip(state['players'], state['player_locations'])):
+        update(Player, rows.players.get(player), loaded_map.location_pks[location], order)
+    update(PlayRoom, rows.playroom_id, state['outbreaks'], state['epidemics'], state['phase'],
+           state['epidemics_to_solve'], state['player_actions'], rows.players.get(state['current_player']),
+           state['nuit_tranquille'])
+    return created
+
+
+def _pop(pks_by_name, name):
+    pks = pks_by_name.get(name)
+    return pks.pop(0) if pks else None
+
+
+def write_changes(changes: Dict[type, List], created: Dict[RoomRows, List[Disease]], batch_size=500):
+    with transaction.atomic():
+        for model, objs in changes.items():
+            if objs:
+                model.objects.bulk_update(objs, UPDATE_FIELDS[model], batch_size=batch_size)
+        if created:
+            Disease.objects.bulk_create([disease for diseases in created.values() for disease in diseases],
+                                        batch_size=batch_size)
+            for rows in created:
+                load_disease_rows(rows)
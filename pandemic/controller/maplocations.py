@@ -1,10 +1,10 @@
 from collections import defaultdict
 from typing import List, Dict, Tuple
-import networkx as nx
 from django.db.models import Sum
 from pandemic.controller import cards
 from pandemic.controller.cards import _check_card_type, dump_location_cards
-from pandemic.controller.utils import get_location_id
+from pandemic.game.maps import MapIndex
+from pandemic.maps import AllMaps
 from pandemic.errors import ResearchCenterAlreadyPresent, ResearchCenterLimit, NoResearchCenterPresent, NoDiseaseToCure, \
     LocationCardsAreMissing, LocationCardsNotMatching, DiseaseAlreadyCured
 from pandemic.models.cards_location import CardLocation, CardPosition
@@ -14,21 +14,21 @@ from pandemic.models import MapState, Disease
 
 
 def get_starting_location(playroom):
-    return playroom.map.starting_location
+    loaded_map = AllMaps.get_map(playroom.map_id)
+    return loaded_map.map_index.locations[loaded_map.starting_location]
 
 
 def initialize_map_states(playroom):
     MapState.objects.filter(playroom=playroom).delete()
-    all_locations = MapLocation.objects.filter(map=playroom.map)
     all_map_states = []
-    for location in all_locations:
-        all_map_states.append(MapState(playroom=playroom, location=location))
+    for location_pk in AllMaps.get_map(playroom.map_id).location_pks:
+        all_map_states.append(MapState(playroom=playroom, location_id=location_pk))
     MapState.objects.bulk_create(all_map_states)
 
 
 def initialize_research_centers(playroom):
     location_init = get_starting_location(playroom)
-    build_research_center(playroom, location_init.name)
+    build_research_center(playroom, location_init)
 
 
 def initialize_infections(playroom):
@@ -111,10 +111,12 @@ def eradicate_disease(playroom) -> List[Disease]:
 
 def infect_locations(playroom, location_names: List[str], number_of_disease=1) -> List[Disease]:
     infected_disease = []
-    locations = MapLocation.objects.filter(name__in=location_names, map=playroom.map)
-    for location in locations:
-        map_state, _ = MapState.objects.get_or_create(location=location, playroom=playroom)
-        disease_type = map_state.location.location_type
+    loaded_map = AllMaps.get_map(playroom.map_id)
+    map_index = loaded_map.map_index
+    for location_name in location_names:
+        location = map_index.location_id(location_name)
+        map_state, _ = MapState.objects.get_or_create(location_id=loaded_map.location_pks[location], playroom=playroom)
+        disease_type = map_index.diseases[map_index.locations_types[location]]
         disease, _ = Disease.objects.get_or_create(map_state=map_state, disease_type=disease_type)
         disease.disease_count += number_of_disease
         infected_disease.append(disease)
@@ -127,7 +129,8 @@ def get_free_research_centers(playroom):
 
 
 def build_research_center(playroom, location_name):
-    map_state = MapState.objects.get(playroom=playroom, location__name=location_name)
+    map_state = MapState.objects.get(playroom=playroom,
+                                  location_id=AllMaps.get_map(playroom.map_id).location_pk(location_name))
     if map_state.research_center:
         raise ResearchCenterAlreadyPresent
     if get_free_research_centers(playroom) < 1:
@@ -137,7 +140,8 @@ def build_research_center(playroom, location_name):
 
 
 def destroy_research_center(playroom, location_name):
-    map_state = MapState.objects.get(playroom=playroom, location__name=location_name)
+    map_state = MapState.objects.get(playroom=playroom,
+                                  location_id=AllMaps.get_map(playroom.map_id).location_pk(location_name))
     if map_state.research_center:
         raise NoResearchCenterPresent
     map_state.research_center = False
@@ -146,18 +150,21 @@ def destroy_research_center(playroom, location_name):
 
 def get_disease_count(playroom) -> Dict[str, Dict[int, int]]:
     disease_count = defaultdict(lambda: defaultdict(lambda: 0))
-    diseases = Disease.objects.filter(map_state__playroom=playroom).prefetch_related('map_state__location')
-    for disease in diseases:
-        disease_count[get_location_id(disease.map_state.location)][disease.disease_type] = disease.disease_count
+    loaded_map = AllMaps.get_map(playroom.map_id)
+    diseases = Disease.objects.filter(map_state__playroom=playroom) \
+        .values_list('map_state__location_id', 'disease_type', 'disease_count')
+    for location_pk, disease_type, count in diseases:
+        disease_count[loaded_map.location_name(location_pk)][disease_type] = count
     return disease_count
 
 
 def get_research_center(playroom) -> Dict[str, bool]:
     dict_location_to_research_centers = defaultdict(lambda: False)
-    all_locations_with_research_centers = MapLocation.objects.filter(location_map_state__playroom=playroom,
-                                                                     location_map_state__research_center=True)
-    for loc in all_locations_with_research_centers:
-        dict_location_to_research_centers[get_location_id(loc)] = True
+    loaded_map = AllMaps.get_map(playroom.map_id)
+    all_locations_with_research_centers = MapState.objects.filter(playroom=playroom, research_center=True) \
+        .values_list('location_id', flat=True)
+    for location_pk in all_locations_with_research_centers:
+        dict_location_to_research_centers[loaded_map.location_name(location_pk)] = True
     return dict_location_to_research_centers
 
 
@@ -169,39 +176,21 @@ def get_disease_status(playroom) -> Dict[str, int]:
     return disease_status
 
 
-def get_location_graph(playroom):
-    location_networkx = nx.DiGraph()
-    neighbors_links = get_all_neighbor_links(playroom)
-    research_links = get_all_research_center_links(playroom)
-    location_networkx.add_edges_from(neighbors_links, edge_type=LocationLinkTypes.neighbor.value)
-    location_networkx.add_edges_from(research_links, edge_type=LocationLinkTypes.research_center.value)
-    return location_networkx
+def get_map_index(playroom) -> MapIndex:
+    return AllMaps.get_map(playroom.map_id).map_index
 
 
 def get_location_types(playroom) -> Dict:
-    all_locations = MapLocation.objects.filter(map__playroom=playroom).values_list("name", "location_type")
-    return {t[0]: t[1] for t in all_locations}
+    map_index = get_map_index(playroom)
+    return {name: map_index.diseases[location_type]
+            for name, location_type in zip(map_index.locations, map_index.locations_types)}
 
 
 def get_all_neighbor_links(playroom):
-    all_locations = MapLocation.objects.filter(map=playroom.map).prefetch_related('neighbors')
-    all_links = [(get_location_id(loc), get_location_id(neighbor))
-                 for loc in all_locations for neighbor in loc.neighbors.all()]
-    return all_links
-
-
-def get_all_research_center_links(playroom) -> List[Tuple[str, str]]:
-    edges = []
-    all_locations_with_research_center = MapLocation.objects.filter(location_map_state__playroom=playroom,
-                                                                    location_map_state__research_center=True)
-    for i in range(0, len(all_locations_with_research_center)):
-        location_in = get_location_id(all_locations_with_research_center[i])
-        for j in range(i, len(all_locations_with_research_center)):
-            location_out = get_location_id(all_locations_with_research_center[j])
-            edges.append((location_in, location_out))
-    return edges
+    map_index = get_map_index(playroom)
+    return [(map_index.locations[location], map_index.locations[neighbor])
+            for location, neighbors in enumerate(map_index.neighbors) for neighbor in neighbors]
 
 
 def get_all_locations(playroom) -> Dict:
-    all_locations = MapLocation.objects.filter(map=playroom.map).prefetch_related("neighbors")
-    return {loc.name: loc.serialize() for loc in all_locations}
+    return AllMaps.get_map(playroom.map_id).locations_setup
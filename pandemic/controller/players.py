@@ -4,7 +4,8 @@ from typing import Dict, List
 from django.db.models import Max
 
 from pandemic.controller import maplocations
-from pandemic.controller.utils import get_location_id, get_player_id
+from pandemic.controller.utils import get_player_id
+from pandemic.maps import AllMaps
 from pandemic.errors import TooManyPlayers, PlayerIsTaken, PlayerAlreadyExists, PlayerHasNoRole, RoleDoesNotExists, \
     RoleAlreadyTaken, PlayerUnready, GameHasStarted
 from pandemic.models import Player, PlayRoom
@@ -16,9 +17,9 @@ from pandemic.models.player import PlayerRolesEnum
 def initialize_player_location(playroom):
     all_players = Player.objects.filter(playroom=playroom).all()
     location_init = maplocations.get_starting_location(playroom)
+    location_pk = AllMaps.get_map(playroom.map_id).location_pk(location_init)
     for player in all_players:
-        print("*************** player.name -> int location", location_init)
-        player.location = location_init
+        player.location_id = location_pk
         player.save()
 
 
@@ -47,14 +48,18 @@ def rename_player(player, new_name, playroom):
 
 
 def free_player(playroom, player_name):
+    # returns the channel of the consumer the player was taken by
     if Player.objects.filter(name=player_name, playroom=playroom).exists():
         player = Player.objects.get(name=player_name, playroom=playroom)
+        channel_name = player.channel_name
         if not playroom.has_started:
             player.delete()
         else:
             player.taken = False
             player.ready = False
+            player.channel_name = None
             player.save()
+        return channel_name
 
 
 def check_start_game(playroom) -> bool:
@@ -96,29 +101,31 @@ def unready_player(player: Player):
     player.save()
 
 
-def take_player(playername, playroom) -> Player:
+def take_player(playername, playroom, channel_name=None) -> Player:
     player = Player.objects.get(name=playername, playroom=playroom)
     if player.taken:
         raise PlayerIsTaken
     player.taken = True
+    player.channel_name = channel_name
 
     player.save()
     return player
 
 
-def create_player(playername, playroom) -> Player:
+def create_player(playername, playroom, channel_name=None) -> Player:
     current_player_count = Player.objects.filter(playroom=playroom).count()
     if current_player_count >= 4:
         raise TooManyPlayers
     if Player.objects.filter(name=playername, playroom=playroom).exists():
         raise PlayerAlreadyExists
-    player = Player.objects.create(name=playername, playroom=playroom, taken=True)
+    player = Player.objects.create(name=playername, playroom=playroom, taken=True, channel_name=channel_name)
     return player
 
 
 def get_players_locations(playroom) -> Dict[str, str]:
-    all_players = Player.objects.filter(playroom=playroom).prefetch_related('location')
-    return {get_player_id(player): get_location_id(player.location) for player in all_players}
+    loaded_map = AllMaps.get_map(playroom.map_id)
+    all_players = Player.objects.filter(playroom=playroom)
+    return {get_player_id(player): loaded_map.location_name(player.location_id) for player in all_players}
 
 
 def get_player_roles(playroom) -> Dict[str, int]:
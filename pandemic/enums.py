@@ -0,0 +1,62 @@
+import enum
+
+
+class PlayPhases(enum.Enum):
+    end_turn = "end_turn"
+    not_started = "not_started"
+    player_action = "player_action"
+    dump_card = "dump_card"
+    solve_epidemic = "solve_epidemic"
+    defeat = "defeat"
+    victory = "victory"
+    destroy_research_center = 'destroy'
+
+
+class PlayerRolesEnum(enum.Enum):
+    medecin = "medecin"
+    planificateur = "planificateur"
+    repartiteuse = "repartiteuse"
+    scientifique = "scientifique"
+    expert = "expert"
+    specialiste = "specialiste"
+    chercheuse = "chercheuse"
+
+
+class DiseaseStatusEnum(enum.Enum):
+    ongoing = "ongoing"
+    cured = "cured"
+    eradicated = "eradicated"
+
+
+class LocationType(enum.Enum):
+    black = "black"
+    blue = "blue"
+    red = "red"
+    yellow = "yellow"
+
+
+class LocationLinkTypes(enum.Enum):
+    neighbor = 0
+    research_center = 1
+
+
+class CardPosition(enum.Enum):
+    hand = 'hand'
+    special = 'special'
+    deck = 'deck'
+    dump = 'dump'
+    removed = 'removed'
+
+
+class CardEvent(enum.Enum):
+    pont = 'Pont Aérien'
+    subvention = "Subvention Publique"
+    nuit = "Nuit Tranquille"
+    population = "Population Résiliente"
+    prevision = "Prévision"
+
+
+class CardType(enum.Enum):
+    epidemic = 'epidemic'
+    location = 'location'
+    event = 'event'
@@ -205,3 +205,23 @@ class InvalidCard(Error):
 class TooManyCards(Error):
     def __init__(self):
         Error.__init__(self, "Trop de cartes !")
+
+
+class GameStateConflict(Error):
+    def __init__(self):
+        Error.__init__(self, "La partie a été modifiée en même temps, réessayez !")
+
+
+class RoomBusy(Error):
+    def __init__(self):
+        Error.__init__(self, "Trop de commandes en attente dans la partie, réessayez !")
+
+
+class InvalidCommand(Error):
+    def __init__(self):
+        Error.__init__(self, "Commande invalide !")
+
+
+class GameLogIncomplete(Error):
+    def __init__(self):
+        Error.__init__(self, "L'historique de la partie est incomplet, elle ne peut pas être reprise !")
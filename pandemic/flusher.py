@@ -0,0 +1,117 @@
+import atexit
+import threading
+import traceback
+from collections import OrderedDict
+
+from django.db import close_old_connections
+
+import pandemic.controller.gamesync as gamesync
+from pandemic_back import settings
+
+
+class GameFlusher:
+    # write-behind of the in-memory games to their database rows: the commands only capture the state,
+    # a background thread writes every room captured since the last flush in one transaction
+    pending = dict()
+    rooms = OrderedDict()
+    lock = threading.Lock()
+    flush_lock = threading.Lock()
+    wake_up = threading.Event()
+    thread = None
+
+    @staticmethod
+    def capture(game_state):
+        return {
+            'map_id': game_state.playroom.map_id,
+            'players': list(game_state.players),
+            'player_locations': list(game_state.player_locations),
+            'player_hands': {player: list(hand) for player, hand in game_state.player_hands.items()},
+            'location_deck': list(game_state.location_deck),
+            'location_dump': list(game_state.location_dump),
+            'infection_deck': list(game_state.infection_deck),
+            'infection_dump': list(game_state.infection_dump),
+            'locations_disease_count': bytes(game_state.locations_disease_count),
+            'locations_research_center': game_state.locations_research_center,
+            'disease_status': list(game_state.disease_status),
+            'outbreaks': game_state.outbreaks,
+            'epidemics': game_state.epidemics,
+            'phase': game_state.phase,
+            'epidemics_to_solve': game_state.epidemics_to_solve,
+            'player_actions': game_state.player_actions,
+            'current_player': game_state.current_player,
+            'nuit_tranquille': game_state.nuit_tranquille,
+        }
+
+    @classmethod
+    def mark(cls, game_state, turn_boundary=False):
+        state = cls.capture(game_state)
+        with cls.lock:
+            cls.pending[game_state.playroom.pk] = state
+            cls.start()
+        if turn_boundary:
+            cls.wake_up.set()
+
+    @classmethod
+    def forget(cls, playroom):
+        # the rows of the room are created again by a new game setup
+        with cls.flush_lock, cls.lock:
+            cls.pending.pop(playroom.pk, None)
+            cls.rooms.pop(playroom.pk, None)
+
+    @classmethod
+    def start(cls):
+        if cls.thread is None or not cls.thread.is_alive():
+            cls.thread = threading.Thread(target=cls.run, name='game-flusher', daemon=True)
+            cls.thread.start()
+
+    @classmethod
+    def run(cls):
+        # GAME_FLUSH_INTERVAL = 0 only flushes on turn boundaries
+        while True:
+            cls.wake_up.wait(settings.GAME_FLUSH_INTERVAL or None)
+            cls.wake_up.clear()
+            try:
+                cls.flush()
+            except Exception:
+                traceback.print_exc()
+
+    @classmethod
+    def flush(cls):
+        with cls.flush_lock:
+            return cls._flush()
+
+    @classmethod
+    def _flush(cls):
+        with cls.lock:
+            pending, cls.pending = cls.pending, dict()
+        if not pending:
+            return 0
+        close_old_connections()
+        changes = {model: [] for model in gamesync.UPDATE_FIELDS}
+        created = {}
+        try:
+            for playroom_id, state in pending.items():
+                rows = cls.rooms.get(playroom_id)
+                if rows is None:
+                    rows = cls.rooms[playroom_id] = gamesync.load_room_rows(playroom_id)
+                cls.rooms.move_to_end(playroom_id)
+                diseases = gamesync.room_changes(rows, state, changes)
+                if diseases:
+                    created[rows] = diseases
+            gamesync.write_changes(changes, created)
+            while len(cls.rooms) > settings.GAME_MAX_ROOMS:
+                cls.rooms.popitem(last=False)
+        except Exception:
+            # nothing was written: the cached rows are reloaded and the states flushed again,
+            # unless a newer state of the room was captured meanwhile
+            with cls.lock:
+                for playroom_id, state in pending.items():
+                    cls.rooms.pop(playroom_id, None)
+                    cls.pending.setdefault(playroom_id, state)
+            raise
+        finally:
+            close_old_connections()
+        return sum(len(objs) for objs in changes.values())
+
+
+atexit.register(GameFlusher.flush)
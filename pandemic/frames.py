@@ -0,0 +1,113 @@
+import json
+
+import msgpack
+
+from pandemic.enums import CardEvent, DiseaseStatusEnum
+from pandemic.game.cards import EPIDEMIC_CARD
+from pandemic.game.maps import MapIndex
+
+# sockets opened with this subprotocol get binary frames: msgpack arrays of [type, message] where the locations,
+# diseases, cards and disease status of the game_state messages are ids in the dictionary of game_setup,
+# and the keyed collections of locations or diseases are flat arrays
+COMPACT_SUBPROTOCOL = 'pandemic.compact.v1'
+
+
+def encode_frame(msg_type, message) -> str:
+    # the message is embedded as is, never as a JSON string inside the frame
+    return json.dumps({'type': msg_type, 'message': message}, separators=(',', ':'))
+
+
+def encode_compact_frame(msg_type, message) -> bytes:
+    return msgpack.packb([msg_type, message])
+
+
+def frame_event(msg_type, message, encoder: 'CompactEncoder' = None):
+    # group message carrying a frame encoded once for every socket of the group, in both encodings,
+    # see PlayConsumer.frame
+    compact_message = encoder.encode_game_state(message) if encoder and msg_type == 'game_state' else message
+    return {
+        'type': 'frame',
+        'text': encode_frame(msg_type, message),
+        'bytes': encode_compact_frame(msg_type, compact_message),
+    }
+
+
+def join_frames(frames):
+    # one frame holding the array of the frames of a socket, they are not decoded again. A socket only
+    # gets these arrays, whatever the number of messages
+    if isinstance(frames[0], bytes):
+        return msgpack.Packer().pack_array_header(len(frames)) + b''.join(frames)
+    return '[' + ','.join(frames) + ']'
+
+
+def batch_event(events):
+    # group message carrying the group messages of one command, see PlayConsumer.batch
+    return events[0] if len(events) == 1 else {'type': 'batch', 'events': events}
+
+
+class Outbox:
+    # what one command sends, held until it is handled, see PlayConsumer.outbound_batch
+    __slots__ = ('frames', 'group_events')
+
+    def __init__(self):
+        self.frames = []
+        self.group_events = []
+
+
+class CompactEncoder:
+    encoders = dict()
+
+    def __init__(self, map_index: MapIndex):
+        self.map_index = map_index
+        self.cards = [*map_index.locations, *(event.value for event in CardEvent), EPIDEMIC_CARD]
+        self.card_ids = {card: card_id for card_id, card in enumerate(self.cards)}
+        self.disease_ids = {disease: d_idx for d_idx, disease in enumerate(map_index.diseases)}
+        self.statuses = [status.value for status in DiseaseStatusEnum]
+        self.status_ids = {status: status_id for status_id, status in enumerate(self.statuses)}
+        self.dictionary = {
+            'locations': list(map_index.locations),
+            'diseases': list(map_index.diseases),
+            'cards': self.cards,
+            'disease_status': self.statuses,
+        }
+        self.field_encoders = {
+            'player_locations': lambda locations: {player: self.location_id(location)
+                                                   for player, location in locations.items()},
+            'player_hands': lambda hands: {player: self.card_list(hand) for player, hand in hands.items()},
+            'locations_research_center': lambda centers: [value for location, has_center in centers.items()
+                                                          for value in (self.location_id(location), int(has_center))],
+            'locations_disease_count': self.disease_cells,
+            'disease_status': lambda diseases: [value for disease in diseases for value in (
+                self.disease_ids[disease['type']], disease['count'], self.status_ids[disease['status']])],
+            'locations_types': lambda types: [self.disease_ids[types[location]] for location in map_index.locations],
+            'location_dump': self.card_list,
+            'infection_dump': self.card_list,
+            'infections': lambda reports: [{
+                'cubes': [value for cube in report['cubes'] for value in (
+                    self.location_id(cube['location']), self.disease_ids[cube['type']], cube['count'])],
+                'outbreaks': [self.location_id(location) for location in report['outbreaks']],
+                'defeat': report['defeat'],
+            } for report in reports],
+        }
+
+    @classmethod
+    def for_map(cls, map_index: MapIndex) -> 'CompactEncoder':
+        encoder = cls.encoders.get(map_index)
+        if encoder is None:
+            encoder = cls.encoders[map_index] = cls(map_index)
+        return encoder
+
+    def location_id(self, location):
+        return self.map_index.location_ids[location]
+
+    def card_list(self, cards):
+        return [self.card_ids.get(card, card) for card in cards]
+
+    def disease_cells(self, locations):
+        # flat (location, disease, count) triples
+        return [value for item in locations for disease in item['diseases'] for value in (
+            self.location_id(item['location']), self.disease_ids[disease['type']], disease['count'])]
+
+    def encode_game_state(self, message):
+        return {field: self.field_encoders[field](value) if field in self.field_encoders else value
+                for field, value in message.items()}
@@ -1,7 +1,12 @@
 import pandemic.game.cards
 import pandemic.game.diseases
 import pandemic.game.endgame
+import pandemic.game.history
 import pandemic.game.infections
 import pandemic.game.locations
+import pandemic.game.maps
 import pandemic.game.players
 import pandemic.game.rules
+import pandemic.game.state
+import pandemic.game.actions
+import pandemic.game.setup
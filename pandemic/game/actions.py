@@ -0,0 +1,213 @@
+from abc import abstractmethod
+
+from pandemic import errors
+from pandemic.enums import CardEvent
+
+
+class GameAction:
+    def __init__(self):
+        self.cancellable = []
+        self.args = []
+
+    @abstractmethod
+    def apply_to_game_state(self, player, game_state):
+        pass
+
+
+class Move(GameAction):
+
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if len(self.args) == 1 or not self.args[1]:
+            return game_state.move(player, player, self.args[0])
+        return game_state.move(player, self.args[0], self.args[1])
+
+
+class Heal(GameAction):
+
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        return game_state.heal(player, self.args[0])
+
+
+class EndTurn(GameAction):
+
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.cancellable = False
+
+    def apply_to_game_state(self, player, game_state):
+        return game_state.end_turn(player)
+
+
+class DumpCard(GameAction):
+
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if len(self.args) == 1 or not self.args[1]:
+            return game_state.dump_card(player, self.args[0])
+        return game_state.dump_card(player, self.args[0], self.args[1])
+
+
+class MoveToLocation(GameAction):
+
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if self.args:
+            return game_state.move_to_location(player, self.args[0], self.args[0])
+        raise errors.NoSuchCard
+
+
+class MoveToLocationExpert(GameAction):
+
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if self.args and len(self.args) == 2:
+            return game_state.move_to_locationexpert(player, self.args[0], self.args[1])
+        raise errors.NoSuchCard
+
+
+class MoveFromLocation(GameAction):
+
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if self.args:
+            return game_state.move_from_location(player, self.args[0])
+        raise errors.NoSuchCard
+
+
+class BuildResearchCenter(GameAction):
+
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        return game_state.build_research_center(player)
+
+
+class DestroyResearchCenter(GameAction):
+
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if self.args:
+            return game_state.destroy_research_center(player, self.args[0])
+        raise errors.NoResearchCenterPresent
+
+
+class CureDisease(GameAction):
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if self.args:
+            return game_state.cure_disease(player, self.args)
+        raise errors.NoDisease
+
+
+class GiveCard(GameAction):
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if self.args and len(self.args) == 3:
+            return game_state.give_card(player, *self.args)
+        raise errors.CannotGiveCard
+
+
+class Subvention(GameAction):
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if self.args:
+            return game_state.subvention_publique(player, self.args[0])
+        raise errors.NoSuchLocation
+
+
+class PontAerien(GameAction):
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if self.args and len(self.args) == 2:
+            return game_state.pont_aerien(player, self.args[1], self.args[0])
+        raise errors.NoSuchLocation
+
+
+class NuitTranquille(GameAction):
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        return game_state.play_nuit_tranquille(player)
+
+
+class PopulationResiliente(GameAction):
+    def __init__(self, *args):
+        GameAction.__init__(self)
+        self.args = args
+        self.cancellable = True
+
+    def apply_to_game_state(self, player, game_state):
+        if self.args:
+            return game_state.play_population_resiliente(player, self.args[0])
+        raise errors.NoSuchCard
+
+
+ACTIONS = {action.__name__: action for action in (
+    Move, Heal, EndTurn, DumpCard, MoveToLocation, MoveToLocationExpert, MoveFromLocation, BuildResearchCenter,
+    DestroyResearchCenter, CureDisease, GiveCard, Subvention, PontAerien, NuitTranquille, PopulationResiliente)}
+
+EVENTS = {
+    CardEvent.subvention.value: Subvention,
+    CardEvent.pont.value: PontAerien,
+    CardEvent.nuit.value: NuitTranquille,
+    CardEvent.population.value: PopulationResiliente
+
+}
+
+
+def get_event_class(event_type):
+    if event_type not in EVENTS:
+        raise errors.NoSuchEvent
+    return EVENTS[event_type]
@@ -1,6 +1,7 @@
 from pandemic import errors, game
+from pandemic.game import history
 from pandemic.game.rules import Rules
-from pandemic.models.player import PlayerRolesEnum
+from pandemic.enums import PlayerRolesEnum
 
 
 def check_not_enough_cards(game_state):
@@ -8,23 +9,25 @@ def check_not_enough_cards(game_state):
         raise errors.Defeat
 
 
+EPIDEMIC_CARD = "épidémie"
+
+
 def is_epidemic(card):
-    return card == "épidémie"
+    return card == EPIDEMIC_CARD
 
 
 def _drawn_infection_cards(game_state, card_number):
     drawn_cards = game_state.infection_deck[-card_number:]
-    game_state.infection_deck = game_state.infection_deck[:-card_number]
-
-    game_state.infection_dump.extend(drawn_cards)
+    history.set_field(game_state, 'infection_deck', game_state.infection_deck[:-card_number])
+    history.set_field(game_state, 'infection_dump', game_state.infection_dump + drawn_cards)
     return drawn_cards
 
 
 def _draw_locations_cards(game_state, card_number=2):
     if len(game_state.location_deck) < card_number:
-        return game_state.defeat()
+        return game.endgame.defeat(game_state)
     drawn_cards = game_state.location_deck[-card_number:]
-    game_state.location_deck = game_state.location_deck[:-card_number]
+    history.set_field(game_state, 'location_deck', game_state.location_deck[:-card_number])
     return drawn_cards
 
 
@@ -32,12 +35,21 @@ def add_cards_to_hand_epidemic(game_state, player, drawn_cards) -> int:
     epidemic_to_solve = 0
     for card in drawn_cards:
         if not is_epidemic(card):
-            game_state.player_hands[player].append(card)
+            add_card_to_hand(game_state, player, card)
         else:
             epidemic_to_solve += 1
     return epidemic_to_solve
 
 
+def add_card_to_hand(game_state, player, card):
+    game_state.player_hands[player].append(card)
+    history.record(game_state, (('player_hands', player),), _remove_last_card, player)
+
+
+def _remove_last_card(game_state, player):
+    game_state.player_hands[player].pop()
+
+
 # def player_has(game_state, player, card):
 #     return card in game_state.player_hands[player]
 
@@ -57,42 +69,54 @@ def dump_card(game_state, player, card):
     hand = game_state.player_hands.get(player, [])
     if len(hand) < Rules.max_hand_cards:
         raise errors.CannotDumpCard
-    try:
-        hand.remove(card)
-    except ValueError:
-        raise errors.NoSuchCard
-
-    game_state.location_dump.append(card)
+    use_card(game_state, player, card)
 
 
 def use_card(game_state, player, card):
     hand = game_state.player_hands.get(player, [])
     try:
-        hand.remove(card)
+        index = hand.index(card)
     except ValueError:
         raise errors.NoSuchCard
+    del hand[index]
     game_state.location_dump.append(card)
+    history.record(game_state, (('player_hands', player), ('location_dump', None)), _unuse_card, player, card,
+                   index)
+
+
+def _unuse_card(game_state, player, card, index):
+    game_state.location_dump.pop()
+    game_state.player_hands[player].insert(index, card)
 
 
 def use_cards(game_state, player, cards):
-    hand = game_state.player_hands.get(player, [])
+    for card in cards:
+        use_card(game_state, player, card)
+
+
+def remove_infection_card(game_state, card):
     try:
-        for card in cards:
-            hand.remove(card)
+        index = game_state.infection_dump.index(card)
     except ValueError:
         raise errors.NoSuchCard
-    game_state.location_dump.extend(cards)
+    del game_state.infection_dump[index]
+    history.record(game_state, (('infection_dump', None),), _restore_infection_card, card, index)
+
+
+def _restore_infection_card(game_state, card, index):
+    game_state.infection_dump.insert(index, card)
 
 
 def check_give_card(game_state, player_from, player_to, card):
-    if not card in game_state.locations_types:
+    card_location = game.locations.get_card_location(game_state, card)
+    if card_location is None:
         raise errors.NotALocationCard
     player_from_location = game.players.get_player_location(game_state, player_from)
     player_to_location = game.players.get_player_location(game_state, player_to)
     if not (player_from_location == player_to_location):
         raise errors.NotInTheSamePlace
     is_chercheuse = game.players.is_role(game_state, player_from, PlayerRolesEnum.chercheuse.value)
-    if not (is_chercheuse or player_from_location == card):
+    if not (is_chercheuse or player_from_location == card_location):
         raise errors.NoInTheRightPlace
     return True
 
@@ -101,7 +125,15 @@ def give_card(game_state, player_from, player_to, card):
     hand_from = game_state.player_hands.get(player_from, [])
     hand_to = game_state.player_hands.get(player_to, [])
     try:
-        hand_from.remove(card)
-        hand_to.append(card)
+        index = hand_from.index(card)
     except ValueError:
         raise errors.NoSuchCard
+    del hand_from[index]
+    hand_to.append(card)
+    history.record(game_state, (('player_hands', player_from), ('player_hands', player_to)), _take_back_card,
+                   player_from, player_to, card, index)
+
+
+def _take_back_card(game_state, player_from, player_to, card, index):
+    game_state.player_hands[player_to].pop()
+    game_state.player_hands[player_from].insert(index, card)
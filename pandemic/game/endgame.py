@@ -1,12 +1,13 @@
 from pandemic import errors
-from pandemic.models.playroom import PlayPhases
+from pandemic.game import history
+from pandemic.enums import PlayPhases
 
 
 def defeat(game_state):
-    game_state.phase = PlayPhases.defeat.value
+    history.set_field(game_state, 'phase', PlayPhases.defeat.value)
     raise errors.Defeat
 
 
 def victory(game_state):
-    game_state.phase = PlayPhases.victory.value
+    history.set_field(game_state, 'phase', PlayPhases.victory.value)
     raise errors.Victory
@@ -0,0 +1,55 @@
+def record(game_state, changes, undo, *args):
+    # changes: (field, key) pairs touched by the operation, key is None when the whole field changed
+    mark_dirty(game_state, changes)
+    journal = game_state.journal
+    if journal is not None:
+        journal.append((changes, undo, args))
+
+
+def mark_dirty(game_state, changes):
+    dirty = game_state.dirty
+    for field, key in changes:
+        if key is None:
+            dirty[field] = None
+        else:
+            keys = dirty.setdefault(field, set())
+            if keys is not None:
+                keys.add(key)
+
+
+def pop_dirty(game_state):
+    dirty = game_state.dirty
+    game_state.dirty = {}
+    return dirty
+
+
+def restore_field(game_state, field, value):
+    setattr(game_state, field, value)
+
+
+def set_field(game_state, field, value, key=None):
+    record(game_state, ((field, key),), restore_field, field, getattr(game_state, field))
+    setattr(game_state, field, value)
+
+
+def start_journal(game_state, cancellable):
+    game_state.journal = []
+    game_state.cancellable = cancellable
+
+
+def stop_journal(game_state):
+    journal = game_state.journal
+    game_state.journal = None
+    return journal
+
+
+def checkpoint(game_state):
+    # what follows cannot be cancelled (cards are drawn, infections are revealed...)
+    game_state.cancellable = False
+
+
+def undo(game_state, journal):
+    game_state.journal = None
+    for changes, func, args in reversed(journal):
+        func(game_state, *args)
+        mark_dirty(game_state, changes)
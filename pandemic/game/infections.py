@@ -1,63 +1,109 @@
-import random
+from collections import defaultdict
 
-from pandemic import game
-from pandemic.game import players, locations
+from pandemic.game import players, history, endgame
 from pandemic.game.cards import _drawn_infection_cards
-from pandemic.game.diseases import check_too_many_outbreaks, disease_is_cured, auto_cure_diseases
-from pandemic.game.locations import get_neighbors, get_location_type
+from pandemic.game.diseases import too_many_outbreaks, disease_is_eradicated, auto_cure_diseases, \
+    get_location_disease_count, set_location_disease_count, get_disease_count
+from pandemic.game.locations import get_location_type, get_card_location
 from pandemic.game.rules import Rules
-from pandemic.models.player import PlayerRolesEnum
-from pandemic.models.playroom import PlayPhases
+from pandemic.enums import PlayerRolesEnum, PlayPhases
+
+
+class InfectionReport:
+    __slots__ = ('cubes', 'outbreaks', 'defeat')
+
+    def __init__(self):
+        # cubes: cell (location * n_diseases + disease type) -> cubes placed, outbreaks: locations in chain order
+        self.cubes = defaultdict(int)
+        self.outbreaks = []
+        self.defeat = None
+
+    def serialize(self, map_index):
+        return {
+            'cubes': [{'location': map_index.locations[cell // map_index.n_diseases],
+                       'type': map_index.diseases[cell % map_index.n_diseases],
+                       'count': count} for cell, count in self.cubes.items()],
+            'outbreaks': [map_index.locations[location] for location in self.outbreaks],
+            'defeat': self.defeat
+        }
 
 
 def solve_epidemic(game_state):
     if game_state.epidemics_to_solve > 0:
-        location = game_state.infection_deck[0]
-        infect_locations(game_state, [location], infection_number=3)
-        game_state.infection_deck.pop(0)
-        game_state.epidemics_to_solve -= 1
-        game_state.infection_dump.append(location)
+        card = game_state.infection_deck[0]
+        report = cascade(game_state, [get_card_location(game_state, card)], infection_number=3)
+        history.set_field(game_state, 'infection_deck', game_state.infection_deck[1:])
+        history.set_field(game_state, 'epidemics_to_solve', game_state.epidemics_to_solve - 1)
+        history.set_field(game_state, 'infection_dump', game_state.infection_dump + [card])
+        resolve_report(game_state, report)
 
 
 def shuffle_infection_dump(game_state):
     if game_state.infection_dump:
-        random.shuffle(game_state.infection_dump)
-        game_state.infection_deck.extend(game_state.infection_dump)
-        game_state.infection_dump = []
+        infection_dump = game_state.infection_dump.copy()
+        history.record(game_state, (), _restore_rng, game_state.rng.getstate())
+        game_state.rng.shuffle(infection_dump)
+        history.set_field(game_state, 'infection_deck', game_state.infection_deck + infection_dump)
+        history.set_field(game_state, 'infection_dump', [])
+
+
+def _restore_rng(game_state, state):
+    game_state.rng.setstate(state)
 
 
 def infections(game_state):
     number_of_infections = Rules.infections[game_state.epidemics]
     drawn_cards = _drawn_infection_cards(game_state, number_of_infections)
+    drawn_locations = [get_card_location(game_state, card) for card in drawn_cards]
 
-    protected = set()
+    protected = 0
     specialist_location = players.get_role_location(game_state, PlayerRolesEnum.specialiste.value)
-    if specialist_location:
-        protected = locations.get_all_neighbors(game_state, specialist_location)
-    infect_locations(game_state, drawn_cards, visited=protected)
-    medic_location = players.get_role_location(game_state, PlayerRolesEnum.medecin.value)
-    if medic_location:
-        auto_cure_diseases(game_state, medic_location)
-
-
-def infect_locations(game_state, locations, infection_number=1, disease_type=None, visited=None):
-    if visited is None:
-        visited = set()
-    for location in locations:
-        infection_location(game_state, location, infection_number, visited, disease_type=disease_type)
-
-
-def infection_location(game_state, location, infection_number, visited, disease_type=None):
-    if location not in visited:
-        disease_type = disease_type if disease_type is not None else get_location_type(game_state, location)
-        if game.diseases.disease_is_eradicated(game_state, disease_type):
-            return
-        if game_state.locations_disease_count[location][disease_type] + infection_number < Rules.max_infections + 1:
-            game_state.locations_disease_count[location][disease_type] += infection_number
-        else:
-            game_state.locations_disease_count[location][disease_type] = Rules.max_infections
-            game_state.outbreaks += 1
-            check_too_many_outbreaks(game_state)
-            visited.add(location)
-            neighbors = get_neighbors(game_state, location)
-            infect_locations(game_state, neighbors, infection_number=1, disease_type=disease_type, visited=visited)
+    if specialist_location is not None:
+        protected = game_state.map_index.neighbors_masks[specialist_location] | 1 << specialist_location
+    report = cascade(game_state, drawn_locations, visited=protected)
+    if report.defeat is None:
+        medic_location = players.get_role_location(game_state, PlayerRolesEnum.medecin.value)
+        if medic_location is not None:
+            auto_cure_diseases(game_state, medic_location)
+    resolve_report(game_state, report)
+
+
+def cascade(game_state, locations, infection_number=1, visited=0) -> InfectionReport:
+    # visited: bitset of the locations that cannot be infected anymore during this draw
+    # (protected locations, locations that already had an outbreak)
+    report = InfectionReport()
+    map_index = game_state.map_index
+    disease_count = get_disease_count(game_state)
+    worklist = [(location, infection_number, None) for location in reversed(locations)]
+    while worklist:
+        location, number, disease_type = worklist.pop()
+        if visited >> location & 1:
+            continue
+        if disease_type is None:
+            disease_type = get_location_type(game_state, location)
+        if disease_is_eradicated(game_state, disease_type):
+            continue
+        count = get_location_disease_count(game_state, location, disease_type)
+        placed = min(number, Rules.max_infections - count)
+        if placed > 0:
+            set_location_disease_count(game_state, location, disease_type, count + placed)
+            report.cubes[location * map_index.n_diseases + disease_type] += placed
+            disease_count[disease_type] += placed
+        if count + number > Rules.max_infections:
+            visited |= 1 << location
+            report.outbreaks.append(location)
+            history.set_field(game_state, 'outbreaks', game_state.outbreaks + 1)
+            if too_many_outbreaks(game_state):
+                report.defeat = 'outbreaks'
+                break
+            worklist.extend((neighbor, 1, disease_type) for neighbor in reversed(map_index.neighbors[location]))
+        if disease_count[disease_type] > Rules.max_diseases:
+            report.defeat = 'diseases'
+            break
+    return report
+
+
+def resolve_report(game_state, report):
+    game_state.infection_reports.append(report)
+    if report.defeat is not None:
+        endgame.defeat(game_state)
@@ -1,32 +1,50 @@
 from _ast import Set
 
-import networkx as nx
-
 from pandemic import errors
 from pandemic.errors import NoResearchCenterPresent
-from pandemic.game import cards, players
+from pandemic.game import cards, players, history
 
 
 def get_location_type(game_state, location):
-    return game_state.locations_types[location]
+    return game_state.map_index.locations_types[location]
+
+
+def get_card_location(game_state, card):
+    return game_state.map_index.location_ids.get(card)
+
+
+def get_location_card(game_state, location):
+    return game_state.map_index.locations[location]
 
 
 def get_neighbors(game_state, location):
-    return nx.neighbors(game_state.location_network, location)
+    return game_state.map_index.neighbors[location]
 
 
 def is_neighbor(game_state, location1, location2):
-    return (game_state.location_network.has_edge(location1, location2)
-            or game_state.location_network.has_edge(location1, location2)) \
-           or (has_research_center(game_state, location1) and has_research_center(game_state, location2))
+    return bool(game_state.map_index.neighbors_masks[location1] >> location2 & 1) \
+           or can_shuttle(game_state, location1, location2)
+
+
+def can_shuttle(game_state, location1, location2):
+    both = 1 << location1 | 1 << location2
+    return location1 != location2 and game_state.locations_research_center & both == both
 
 
 def has_research_center(game_state, location):
-    return location in game_state.locations_research_center
+    return bool(game_state.locations_research_center >> location & 1)
+
+
+def count_research_centers(game_state):
+    return game_state.research_center_count
 
 
 def build_research_center(game_state, player, location):
-    game_state.locations_research_center[location] = True
+    if has_research_center(game_state, location):
+        return
+    history.set_field(game_state, 'locations_research_center', game_state.locations_research_center | 1 << location,
+                      key=location)
+    history.set_field(game_state, 'research_center_count', game_state.research_center_count + 1)
 
 
 def check_build_research_center(game_state, location):
@@ -35,16 +53,17 @@ def check_build_research_center(game_state, location):
 
 
 def destroy_research_center(game_state, location):
-    if location not in game_state.locations_research_center:
+    if not has_research_center(game_state, location):
         raise NoResearchCenterPresent
-    del game_state.locations_research_center[location]
+    history.set_field(game_state, 'locations_research_center',
+                      game_state.locations_research_center & ~(1 << location), key=location)
+    history.set_field(game_state, 'research_center_count', game_state.research_center_count - 1)
 
 
 def get_all_neighbors(game_state, location, include_start=True) -> Set:
-    location_network = game_state.location_network
-    if not location in location_network:
+    if not 0 <= location < game_state.map_index.n_locations:
         raise errors.NoSuchLocation
-    neighbors = nx.neighbors(game_state.location_network, location)
+    neighbors = get_neighbors(game_state, location)
     if include_start:
         return {location, *neighbors}
     return {*neighbors}
@@ -0,0 +1,47 @@
+from typing import Dict, Iterable, Tuple
+
+from pandemic import errors
+from pandemic.enums import LocationType
+
+DISEASE_TYPES = tuple(location_type.value for location_type in LocationType)
+
+
+class MapIndex:
+    # locations and disease types are addressed by their position in `locations` and `diseases`
+    # neighbors_masks[location] has the bit of every neighbor of location set
+    __slots__ = ('locations', 'location_ids', 'n_locations', 'diseases', 'disease_ids', 'n_diseases',
+                 'locations_types', 'neighbors', 'neighbors_masks', 'populations', 'coordinates')
+
+    def __init__(self, locations_types: Dict[str, str], links: Iterable[Tuple[str, str]] = (),
+                 diseases: Iterable[str] = DISEASE_TYPES, populations: Dict[str, int] = None,
+                 coordinates: Dict[str, Tuple[float, float]] = None):
+        self.locations = tuple(locations_types)
+        self.location_ids = {name: idx for idx, name in enumerate(self.locations)}
+        self.n_locations = len(self.locations)
+        self.diseases = tuple(diseases)
+        self.disease_ids = {name: idx for idx, name in enumerate(self.diseases)}
+        self.n_diseases = len(self.diseases)
+        self.locations_types = bytes(self.disease_ids[locations_types[name]] for name in self.locations)
+        self.populations = tuple(populations[name] if populations else 0 for name in self.locations)
+        self.coordinates = tuple(coordinates[name] if coordinates else (0., 0.) for name in self.locations)
+
+        masks = [0] * self.n_locations
+        for location_from, location_to in links:
+            id_from, id_to = self.location_ids[location_from], self.location_ids[location_to]
+            masks[id_from] |= 1 << id_to
+            masks[id_to] |= 1 << id_from
+        self.neighbors_masks = tuple(masks)
+        self.neighbors = tuple(tuple(location for location in range(self.n_locations) if mask >> location & 1)
+                               for mask in masks)
+
+    def location_id(self, name):
+        try:
+            return self.location_ids[name]
+        except (KeyError, TypeError):
+            raise errors.NoSuchLocation
+
+    def disease_id(self, name):
+        try:
+            return self.disease_ids[name]
+        except (KeyError, TypeError):
+            raise errors.NoDisease
@@ -1,5 +1,6 @@
 from pandemic import errors
-from pandemic.models.player import PlayerRolesEnum
+from pandemic.game import history
+from pandemic.enums import PlayerRolesEnum
 
 
 def is_repartiteuse(game_state, player):
@@ -22,18 +23,28 @@ def get_player_role(game_state, player):
     return game_state.player_roles.get(player)
 
 
+def get_player_index(game_state, player):
+    try:
+        return game_state.players.index(player)
+    except ValueError:
+        raise errors.InvalidPlayer
+
+
 def get_player_location(game_state, player):
-    return game_state.player_locations[player]
+    return game_state.player_locations[get_player_index(game_state, player)]
 
 
 def set_player_location(game_state, player, to_location):
-    if not to_location in game_state.locations_types:
+    if not 0 <= to_location < game_state.map_index.n_locations:
         raise errors.NoSuchLocation
-    game_state.player_locations[player] = to_location
+    idx_player = get_player_index(game_state, player)
+    history.record(game_state, (('player_locations', player),), set_player_location, player,
+                   game_state.player_locations[idx_player])
+    game_state.player_locations[idx_player] = to_location
 
 
 def increment_plater_action(game_state):
-    game_state.player_actions += 1
+    history.set_field(game_state, 'player_actions', game_state.player_actions + 1)
 
 
 def next_player(game_state):
@@ -43,7 +54,7 @@ def next_player(game_state):
 
 
 def get_role_location(game_state, role):
-    for player, location in game_state.player_locations.items():
+    for player, location in zip(game_state.players, game_state.player_locations):
         if is_role(game_state, player, role):
             return location
     return None
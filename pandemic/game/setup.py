@@ -0,0 +1,80 @@
+import random
+from typing import List, Dict
+
+from pandemic.enums import CardEvent, DiseaseStatusEnum, PlayPhases
+from pandemic.game import cards, diseases
+from pandemic.game.maps import MapIndex
+from pandemic.game.state import GameState
+
+EPIDEMIC_NUMBER = 5
+
+
+def new_game_state(map_index: MapIndex, players: List[str], player_roles: Dict[str, str], starting_location: str,
+                   rng: random.Random, epidemic_number=EPIDEMIC_NUMBER) -> GameState:
+    # same setup as the controllers (initial_location_cards_setup, initial_infection_cards_setup...),
+    # without any database
+    game_state = GameState()
+    game_state.map_index = map_index
+    game_state.rng = rng
+    game_state.players = list(players)
+    game_state.player_roles = dict(player_roles)
+
+    location_cards_setup(game_state, epidemic_number)
+    infection_cards_setup(game_state)
+
+    start = map_index.location_id(starting_location)
+    game_state.player_locations = [start] * len(game_state.players)
+    game_state.locations_research_center = 1 << start
+    game_state.research_center_count = 1
+    game_state.disease_status = [DiseaseStatusEnum.ongoing.value] * map_index.n_diseases
+
+    game_state.players.sort(key=lambda player: max_hand_population(game_state, player), reverse=True)
+    game_state.current_player = game_state.players[0]
+    game_state.phase = PlayPhases.player_action.value
+    game_state.dirty = {}
+    return game_state
+
+
+def location_cards_setup(game_state, epidemic_number):
+    rng = game_state.rng
+    all_deck_cards = [*(event.value for event in CardEvent), *game_state.map_index.locations]
+    rng.shuffle(all_deck_cards)
+
+    player_count = len(game_state.players)
+    card_per_player = 6 - player_count
+    game_state.player_hands = {
+        player: all_deck_cards[player_idx * card_per_player:(player_idx + 1) * card_per_player]
+        for player_idx, player in enumerate(game_state.players)
+    }
+
+    deck_cards = all_deck_cards[player_count * card_per_player:]
+    subdeck_size = len(deck_cards) // epidemic_number
+    list_int_epidemic_pos = [i * subdeck_size + rng.randrange(0, subdeck_size) for i in range(0, epidemic_number)]
+    list_int_epidemic_pos.reverse()
+    location_deck = []
+    for card in deck_cards:
+        location_deck.append(card)
+        if list_int_epidemic_pos and len(location_deck) - 1 == list_int_epidemic_pos[-1]:
+            list_int_epidemic_pos.pop()
+            location_deck.append(cards.EPIDEMIC_CARD)
+    game_state.location_deck = location_deck
+    game_state.location_dump = []
+
+
+def infection_cards_setup(game_state):
+    map_index = game_state.map_index
+    infection_deck = list(map_index.locations)
+    game_state.rng.shuffle(infection_deck)
+    game_state.infection_deck = infection_deck[9:]
+    game_state.infection_dump = infection_deck[:9]
+
+    game_state.locations_disease_count = bytearray(map_index.n_locations * map_index.n_diseases)
+    for idx, card in enumerate(game_state.infection_dump):
+        location = map_index.location_id(card)
+        diseases.set_location_disease_count(game_state, location, map_index.locations_types[location], 3 - idx // 3)
+
+
+def max_hand_population(game_state, player):
+    map_index = game_state.map_index
+    return max((map_index.populations[map_index.location_ids[card]]
+                for card in game_state.player_hands[player] if card in map_index.location_ids), default=0)
@@ -0,0 +1,522 @@
+import random
+from typing import Union, Hashable, Set
+
+from pandemic import errors, game
+from pandemic.enums import CardEvent, PlayerRolesEnum, PlayPhases
+from pandemic.game.rules import Rules
+
+
+class GameStateTools:
+    @classmethod
+    def check_endgame(cls, func):
+        def wrapper(*args):
+            try:
+                return func(*args)
+            except (errors.Victory, errors.Defeat):
+                pass
+
+        return wrapper
+
+    @classmethod
+    def require_current_player(cls, func):
+        def wrapper(*args):
+            game_state = args[0]
+            actiong_player = args[1]
+            if actiong_player == game_state.current_player:
+                return func(*args)
+            raise errors.NotYourTurn
+
+        return wrapper
+
+    @classmethod
+    def require_action(cls, func):
+        def wrapper(*args):
+            game_state = args[0]
+            if game_state.player_actions < Rules.max_actions:
+                res = func(*args)
+                game.players.increment_plater_action(game_state)
+                return res
+            raise errors.RequireAction
+
+        return wrapper
+
+    @classmethod
+    def require_phase(cls, phase: Union[Hashable, Set]):
+        def decorator(func):
+            if isinstance(phase, set):
+                test = lambda game_state: game_state.phase in phase
+            else:
+                test = lambda game_state: game_state.phase == phase
+
+            def wrapper(*args):
+                game_state = args[0]
+                if not test(game_state):
+                    raise errors.InvalidGamePhase
+                return func(*args)
+
+            return wrapper
+
+        return decorator
+
+    @classmethod
+    def require_role(cls, role: Union[Hashable, Set]):
+        def decorator(func):
+            if isinstance(role, set):
+                test = lambda game_state: game_state.player_roles[game_state.current_player] in role
+            else:
+                test = lambda game_state: game_state.player_roles[game_state.current_player] == role
+
+            def wrapper(*args):
+                game_state = args[0]
+                if not test(game_state):
+                    raise errors.InvalidPlayer
+                return func(*args)
+
+            return wrapper
+
+        return decorator
+
+
+def disease_status_adapter(game_state, keys=None):
+    disease_count = game.diseases.get_disease_count(game_state)
+    return [{'type': d_type, 'count': disease_count[idx], 'status': game_state.disease_status[idx]}
+            for idx, d_type in enumerate(game_state.map_index.diseases) if keys is None or idx in keys]
+
+
+def locations_disease_count_adapter(game_state, keys=None):
+    map_index = game_state.map_index
+    disease_count = game_state.locations_disease_count
+    n_diseases = map_index.n_diseases
+    if keys is None:
+        return [{'location': location,
+                 'diseases': [{'type': d_type, 'count': disease_count[offset + d_idx]}
+                              for d_idx, d_type in enumerate(map_index.diseases) if disease_count[offset + d_idx]]}
+                for location, offset in zip(map_index.locations, range(0, len(disease_count), n_diseases))]
+    dict_location_diseases = {}
+    for cell in sorted(keys):
+        location, d_idx = divmod(cell, n_diseases)
+        dict_location_diseases.setdefault(location, []).append(
+            {'type': map_index.diseases[d_idx], 'count': disease_count[cell]})
+    return [{'location': map_index.locations[location], 'diseases': diseases}
+            for location, diseases in dict_location_diseases.items()]
+
+
+def locations_research_center_adapter(game_state, keys=None):
+    if keys is None:
+        return {location: True for idx, location in enumerate(game_state.map_index.locations)
+                if game.locations.has_research_center(game_state, idx)}
+    return {game_state.map_index.locations[idx]: game.locations.has_research_center(game_state, idx)
+            for idx in keys}
+
+
+def player_locations_adapter(game_state, keys=None):
+    locations = game_state.map_index.locations
+    return {player: locations[location] for player, location in zip(game_state.players, game_state.player_locations)
+            if keys is None or player in keys}
+
+
+def player_hands_adapter(game_state, keys=None):
+    return {player: hand for player, hand in game_state.player_hands.items() if keys is None or player in keys}
+
+
+def locations_types_adapter(game_state, keys=None):
+    map_index = game_state.map_index
+    return {location: map_index.diseases[d_type] for location, d_type in
+            zip(map_index.locations, map_index.locations_types)}
+
+
+def merge_dict_delta(previous, delta):
+    return {**previous, **delta}
+
+
+def merge_disease_status_delta(previous, delta):
+    merged = {disease['type']: disease for disease in previous}
+    merged.update((disease['type'], disease) for disease in delta)
+    return list(merged.values())
+
+
+def merge_locations_disease_count_delta(previous, delta):
+    merged = {item['location']: {disease['type']: disease for disease in item['diseases']} for item in previous}
+    for item in delta:
+        merged.setdefault(item['location'], {}).update((disease['type'], disease) for disease in item['diseases'])
+    return [{'location': location, 'diseases': list(diseases.values())} for location, diseases in merged.items()]
+
+
+def copy_field(value):
+    # the containers of the game state hold strings and numbers, or lists of them for the hands
+    if isinstance(value, (list, bytearray)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {key: item.copy() if isinstance(item, list) else item for key, item in value.items()}
+    return value
+
+
+class GameState:
+    __slots__ = ('playroom', 'map_index', 'players', 'player_roles', 'player_locations', 'player_hands',
+                 'locations_disease_count', 'locations_research_center', 'research_center_count', 'disease_status',
+                 'location_deck', 'infection_deck', 'location_dump', 'infection_dump', 'epidemics', 'outbreaks', 'phase',
+                 'phase_on_hold', 'epidemics_to_solve', 'player_actions', 'current_player',
+                 'cancellable', 'nuit_tranquille', 'journal', 'dirty', 'version', 'infection_reports',
+                 'rng')
+
+    serialization_fields = ['player_roles', 'player_locations', 'player_hands', 'locations_disease_count',
+                            'locations_research_center', 'disease_status', 'location_deck_count',
+                            'infection_deck_count',
+                            'location_dump', 'infection_dump', 'epidemics', 'outbreaks',
+                            'outbreaks', 'phase',
+                            'epidemics_to_solve', 'player_actions', 'current_player', 'locations_types',
+                            'cancellable', 'version']
+    serialization_aliases = {
+        'location_deck': 'location_deck_count',
+        'infection_deck': 'infection_deck_count',
+    }
+    serialization_adapters = {
+        'location_deck_count': lambda game_state, keys=None: len(game_state.location_deck),
+        'infection_deck_count': lambda game_state, keys=None: len(game_state.infection_deck),
+        'locations_disease_count': locations_disease_count_adapter,
+        'locations_research_center': locations_research_center_adapter,
+        'player_locations': player_locations_adapter,
+        'player_hands': player_hands_adapter,
+        'locations_types': locations_types_adapter,
+        'disease_status': disease_status_adapter
+    }
+    # how the delta of a later command is laid over an earlier one, the other fields are replaced
+    delta_mergers = {
+        'locations_disease_count': merge_locations_disease_count_delta,
+        'locations_research_center': merge_dict_delta,
+        'player_locations': merge_dict_delta,
+        'player_hands': merge_dict_delta,
+        'disease_status': merge_disease_status_delta,
+        'infections': lambda previous, delta: previous + delta,
+    }
+    # everything a game changes, see dump and load
+    dump_fields = ['players', 'player_roles', 'player_locations', 'player_hands', 'locations_disease_count',
+                   'locations_research_center', 'research_center_count', 'disease_status', 'location_deck',
+                   'infection_deck', 'location_dump', 'infection_dump', 'epidemics', 'outbreaks', 'phase',
+                   'phase_on_hold', 'epidemics_to_solve', 'player_actions', 'current_player', 'cancellable',
+                   'nuit_tranquille', 'version']
+
+    def __init__(self, playroom=None):
+        self.playroom = playroom
+        self.map_index = None
+        self.players = []
+        self.player_roles = dict()
+        self.player_locations = list()
+        self.player_hands = dict()
+        self.locations_disease_count = bytearray()
+        self.locations_research_center = 0
+        self.research_center_count = 0
+        self.disease_status = list()
+        self.location_deck = list()
+        self.infection_deck = list()
+        self.location_dump = list()
+        self.infection_dump = list()
+        self.epidemics = 0
+        self.outbreaks = 0
+        self.phase = PlayPhases.not_started.value
+        self.phase_on_hold = None
+        self.epidemics_to_solve = 0
+        self.player_actions = 0
+        self.current_player = None
+        self.cancellable = False
+        self.nuit_tranquille = False
+        self.journal = None
+        self.dirty = {}
+        self.version = 0
+        self.infection_reports = []
+        self.rng = random.Random()
+
+    def snapshot(self) -> 'GameState':
+        # copy of the dump fields, sharing the map and the playroom: what a command changes later
+        # is not seen by the snapshot
+        snapshot = type(self).__new__(type(self))
+        snapshot.playroom = self.playroom
+        snapshot.map_index = self.map_index
+        for field in self.dump_fields:
+            setattr(snapshot, field, copy_field(getattr(self, field)))
+        snapshot.journal = None
+        snapshot.dirty = {}
+        snapshot.infection_reports = []
+        snapshot.rng = random.Random()
+        snapshot.rng.setstate(self.rng.getstate())
+        return snapshot
+
+    def dump(self):
+        # json serializable, locations are dumped as ids of the map index
+        dump = {field: getattr(self, field) for field in self.dump_fields}
+        dump['locations_disease_count'] = list(self.locations_disease_count)
+        dump['rng'] = self.rng.getstate()
+        return dump
+
+    def load(self, dump):
+        for field in self.dump_fields:
+            setattr(self, field, dump[field])
+        self.locations_disease_count = bytearray(dump['locations_disease_count'])
+        if len(self.locations_disease_count) != self.map_index.n_locations * self.map_index.n_diseases:
+            raise errors.NoSuchLocation
+        version, internal_state, gauss_next = dump['rng']
+        self.rng.setstate((version, tuple(internal_state), gauss_next))
+        self.journal = None
+        self.dirty = {}
+        self.infection_reports = []
+
+    def serialize(self):
+        return self.serialize_fields(self.serialization_fields)
+
+    def serialize_delta(self):
+        dirty = game.history.pop_dirty(self)
+        if dirty:
+            self.version += 1
+        dict_delta = {}
+        for field, keys in dirty.items():
+            field = self.serialization_aliases.get(field, field)
+            if field in self.serialization_adapters:
+                dict_delta[field] = self.serialization_adapters[field](self, keys)
+            elif field in self.serialization_fields:
+                dict_delta[field] = getattr(self, field)
+        dict_delta['version'] = self.version
+        if self.infection_reports:
+            dict_delta['infections'] = [report.serialize(self.map_index) for report in self.infection_reports]
+            self.infection_reports = []
+        return dict_delta
+
+    @classmethod
+    def merge_deltas(cls, deltas):
+        # one delta equivalent to the serialize_delta results of consecutive commands
+        merged = {}
+        for delta in deltas:
+            for field, value in delta.items():
+                if field in merged and field in cls.delta_mergers:
+                    value = cls.delta_mergers[field](merged[field], value)
+                merged[field] = value
+        return merged
+
+    def serialize_fields(self, fields):
+        return {
+            field: getattr(self, field)
+            if field not in self.serialization_adapters
+            else self.serialization_adapters[field](self)
+            for field in fields
+        }
+
+    def hold_phase(self, new_phase):
+        game.history.set_field(self, 'phase_on_hold', self.phase)
+        game.history.set_field(self, 'phase', new_phase)
+
+    def resume_phase(self):
+        if not self.phase_on_hold:
+            game.history.set_field(self, 'phase', PlayPhases.player_action.value)
+        else:
+            game.history.set_field(self, 'phase', self.phase_on_hold)
+            game.history.set_field(self, 'phase_on_hold', None)
+        return self.phase
+
+    @GameStateTools.check_endgame
+    @GameStateTools.require_current_player
+    @GameStateTools.require_action
+    @GameStateTools.require_phase(PlayPhases.player_action.value)
+    def move(self, player, moving_player, to_location):
+        is_repartiteuse = game.players.is_repartiteuse(self, player)
+        if not (player == moving_player or is_repartiteuse):
+            raise errors.CannotMoveOthers
+        player_location = game.players.get_player_location(self, moving_player)
+        to_location = self.map_index.location_id(to_location)
+        if not game.locations.is_neighbor(self, player_location, to_location):
+            if not (is_repartiteuse and to_location in self.player_locations):
+                raise errors.NotANeighbor
+        self._do_move(moving_player, to_location)
+
+    def _do_move(self, moving_player, to_location):
+        game.players.set_player_location(self, moving_player, to_location)
+        if game.players.is_medecin(self, moving_player):
+            game.diseases.auto_cure_diseases(self, to_location)
+
+    @GameStateTools.check_endgame
+    def pont_aerien(self, player, moving_player, location):
+        location = self.map_index.location_id(location)
+        game.cards.use_card(self, player, CardEvent.pont.value)
+        self._do_move(moving_player, location)
+        self.check_dump_phase()
+
+    @GameStateTools.check_endgame
+    def play_population_resiliente(self, player, infection_card):
+        game.cards.use_card(self, player, CardEvent.population.value)
+        game.cards.remove_infection_card(self, infection_card)
+        self.check_dump_phase()
+
+    def get_next_infections(self, player, n, need_card):
+        if need_card:
+            game.cards.use_card(self, player, CardEvent.prevision.value)
+            self.check_dump_phase()
+        if self.phase == PlayPhases.solve_epidemic.value:
+            game.infections.shuffle_infection_dump(self)
+
+        next_infections = self.infection_deck[-n:]
+        next_infections.reverse()
+        return next_infections
+
+    def set_next_infections(self, player, cards):
+        max_cards = 6
+        if len(cards) > max_cards:
+            raise errors.TooManyCards
+        if not cards:
+            raise errors.InvalidCard
+
+        set_top_deck = set(self.infection_deck[-len(cards):])
+        for card in cards:
+            if not card in set_top_deck:
+                raise errors.InvalidCard
+        game.history.set_field(self, 'infection_deck', self.infection_deck[:-len(cards)] + cards[::-1])
+
+    def play_nuit_tranquille(self, player):
+        game.cards.use_card(self, player, CardEvent.nuit.value)
+        game.history.set_field(self, 'nuit_tranquille', True)
+        self.check_dump_phase()
+
+    @GameStateTools.check_endgame
+    @GameStateTools.require_current_player
+    @GameStateTools.require_action
+    @GameStateTools.require_phase(PlayPhases.player_action.value)
+    def heal(self, player, disease_type=None):
+        player_location = game.players.get_player_location(self, player)
+        disease_type = self.map_index.disease_ids.get(disease_type)
+        if disease_type is None:
+            disease_type = game.diseases.get_disease_to_heal(self, player_location)
+        number_of_disease_to_heal = game.diseases.get_number_of_disease_to_heal(self, player, player_location,
+                                                                                disease_type)
+        game.diseases.remove_disease_from_location(self, player_location, disease_type, number_of_disease_to_heal)
+
+    @GameStateTools.require_phase(PlayPhases.dump_card.value)
+    def dump_card(self, player, *cards):
+        for card in cards:
+            game.cards.dump_card(self, player, card)
+            if not game.cards.player_hand_limit(self, player):
+                break
+        new_phase = self.check_dump_phase()
+        if new_phase == PlayPhases.end_turn.value:
+            self.end_turn(player)
+
+    def check_dump_phase(self):
+        if self.phase == PlayPhases.dump_card.value:
+            if not game.cards.any_player_hand_limit(self):
+                return self.resume_phase()
+
+    @GameStateTools.check_endgame
+    @GameStateTools.require_current_player
+    @GameStateTools.require_action
+    @GameStateTools.require_phase(PlayPhases.player_action.value)
+    def move_to_location(self, player, to_location, card_to_use):
+        to_location = self.map_index.location_id(to_location)
+        game.cards.use_card(self, player, card_to_use)
+        game.players.set_player_location(self, player, to_location)
+        self._do_move(player, to_location)
+
+    @GameStateTools.require_role(PlayerRolesEnum.expert.value)
+    def move_to_locationexpert(self, player, to_location, card_to_use):
+        return self.move_to_location(player, to_location, card_to_use)
+
+    @GameStateTools.check_endgame
+    @GameStateTools.require_current_player
+    @GameStateTools.require_action
+    @GameStateTools.require_phase(PlayPhases.player_action.value)
+    def move_from_location(self, player, to_location):
+        player_location = game.players.get_player_location(self, player)
+        to_location = self.map_index.location_id(to_location)
+        game.cards.use_card(self, player, game.locations.get_location_card(self, player_location))
+        self._do_move(player, to_location)
+
+    @GameStateTools.require_current_player
+    @GameStateTools.require_action
+    @GameStateTools.require_phase(PlayPhases.player_action.value)
+    def build_research_center(self, player):
+        player_location = game.players.get_player_location(self, player)
+        game.locations.check_build_research_center(self, player_location)
+        if not game.players.is_expert(self, player):
+            game.cards.use_card(self, player, game.locations.get_location_card(self, player_location))
+        self._do_build_research_center(player, player_location)
+
+    def _do_build_research_center(self, player, player_location):
+        game.locations.build_research_center(self, player, player_location)
+        if game.locations.count_research_centers(self) >= Rules.max_research_centers:
+            self.hold_phase(PlayPhases.destroy_research_center.value)
+
+    @GameStateTools.check_endgame
+    def subvention_publique(self, player, location):
+        location = self.map_index.location_id(location)
+        game.cards.use_card(self, player, CardEvent.subvention.value)
+        self.check_dump_phase()
+        self._do_build_research_center(player, location)
+
+    @GameStateTools.require_current_player
+    @GameStateTools.require_phase(PlayPhases.destroy_research_center.value)
+    def destroy_research_center(self, player, location):
+        location = self.map_index.location_id(location)
+        if game.locations.has_research_center(self, location):
+            game.locations.destroy_research_center(self, location)
+        if game.locations.count_research_centers(self) >= Rules.max_research_centers:
+            self.hold_phase(PlayPhases.destroy_research_center.value)
+        else:
+            self.resume_phase()
+
+    @GameStateTools.check_endgame
+    @GameStateTools.require_current_player
+    @GameStateTools.require_action
+    @GameStateTools.require_phase(PlayPhases.player_action.value)
+    def cure_disease(self, player, cards):
+        game.diseases.cure_disease(self, player, cards)
+
+    @GameStateTools.require_action
+    @GameStateTools.require_phase(PlayPhases.player_action.value)
+    def give_card(self, player, player_from, player_to, card):
+        if not (self.current_player == player_from or self.current_player == player_to):
+            raise errors.InvalidPlayer
+        game.cards.check_give_card(self, player_from, player_to, card)
+        game.cards.give_card(self, player_from, player_to, card)
+        if game.cards.player_hand_limit(self, player_to):
+            self.hold_phase(PlayPhases.dump_card.value)
+
+    @GameStateTools.check_endgame
+    @GameStateTools.require_current_player
+    @GameStateTools.require_phase(
+        {PlayPhases.player_action.value, PlayPhases.solve_epidemic.value, PlayPhases.end_turn.value})
+    def end_turn(self, player):
+        if self.phase == PlayPhases.player_action.value and self.player_actions < Rules.max_actions:
+            raise errors.ActionRemainig
+        game.history.checkpoint(self)
+        if self.phase == PlayPhases.player_action.value:
+            drawn_cards = game.cards._draw_locations_cards(self)
+            epidemic_to_solve = game.cards.add_cards_to_hand_epidemic(self, player, drawn_cards)
+            game.history.set_field(self, 'epidemics_to_solve', epidemic_to_solve)
+            game.history.set_field(self, 'epidemics', self.epidemics + epidemic_to_solve)
+            game.history.set_field(self, 'phase', PlayPhases.end_turn.value)
+
+        if game.cards.player_hand_limit(self, player):
+            self.hold_phase(PlayPhases.dump_card.value)
+            return
+
+        if self.epidemics_to_solve:
+            game.history.set_field(self, 'phase', PlayPhases.solve_epidemic.value)
+            game.infections.solve_epidemic(self)
+            return
+
+        if self.phase == PlayPhases.solve_epidemic.value:
+            game.infections.shuffle_infection_dump(self)
+
+        if not self.nuit_tranquille:
+            game.infections.infections(self)
+
+        game.history.set_field(self, 'phase', PlayPhases.player_action.value)
+        game.history.set_field(self, 'nuit_tranquille', False)
+        game.history.set_field(self, 'current_player', game.players.next_player(self))
+        game.history.set_field(self, 'player_actions', 0)
+
+    @GameStateTools.check_endgame
+    @GameStateTools.require_current_player
+    @GameStateTools.require_phase(PlayPhases.solve_epidemic.value)
+    def trigger_infections(self, player):
+        game.history.checkpoint(self)
+        if self.epidemics_to_solve <= 0:
+            game.history.set_field(self, 'epidemics_to_solve', 0)
+            game.infections.infections(self)
+        else:
+            game.infections.solve_epidemic(self)
@@ -1,31 +1,31 @@
-from abc import abstractmethod
-import copy
-from typing import Union, Hashable, Set
+import contextlib
+import json
+import logging
+import threading
+import time
+import traceback
+from collections import defaultdict, OrderedDict
+
+from django.db import close_old_connections, transaction
 
 import pandemic.game as game
 import pandemic.controller as controller
-from pandemic.controller.maplocations import get_location_graph, get_location_types
+import pandemic.controller.gamelog
+from pandemic.controller.maplocations import get_map_index
 from pandemic.controller.utils import get_player_id
-from pandemic import errors
-from pandemic.game.rules import Rules
-from pandemic.models import DiseaseStatus
-from pandemic.models.cards_location import CardEvent
-from pandemic.models.disease import DiseaseStatusEnum
-from pandemic.models.player import PlayerRolesEnum
-from pandemic.models.playroom import PlayPhases
-
+from pandemic import errors, stores
+from pandemic_back import settings
+from pandemic.enums import PlayPhases
+from pandemic.flusher import GameFlusher
+from pandemic.models import PlayRoom
+from pandemic.game.actions import ACTIONS, GameAction, Move, Heal, EndTurn, DumpCard, MoveToLocation, \
+    MoveToLocationExpert, MoveFromLocation, BuildResearchCenter, DestroyResearchCenter, CureDisease, GiveCard, \
+    Subvention, PontAerien, NuitTranquille, PopulationResiliente, EVENTS, get_event_class
 
-class GameTools:
-    @classmethod
-    def backup_point(cls, func):
-        def wrapper(*args):
-            game = args[0]
-            res = func(*args)
-            game.do_backup()
-            return res
+logger = logging.getLogger(__name__)
 
-        return wrapper
 
+class GameTools:
     @classmethod
     def require_phase(cls, phase):
         def decorator(func):
@@ -40,178 +40,273 @@ class GameTools:
         return decorator
 
 
-class GameStateTools:
-    @classmethod
-    def check_endgame(cls, func):
-        def wrapper(*args):
-            try:
-                return func(*args)
-            except (errors.Victory, errors.Defeat):
-                game_state = args[0]
-                return game_state.serialize()
-
-        return wrapper
+class AllGames:
+    # least recently played rooms first
+    dict_playroom_to_game = OrderedDict()
+    dict_playroom_to_lock = defaultdict(threading.Lock)
+    lock = threading.Lock()
+    store = stores.open_game_store(settings.GAME_STORE)
+    metrics = {'evictions': 0, 'restores': 0, 'restore_seconds': 0., 'max_restore_seconds': 0.}
 
     @classmethod
-    def require_current_player(cls, func):
-        def wrapper(*args):
-            game_state = args[0]
-            actiong_player = args[1]
-            if actiong_player == game_state.current_player:
-                return func(*args)
-            raise errors.NotYourTurn
-
-        return wrapper
+    def register_game(cls, playroom):
+        with cls.lock:
+            if playroom.name not in cls.dict_playroom_to_game:
+                new_game = Game(playroom)
+                cls.dict_playroom_to_game[playroom.name] = new_game
+                return new_game
+            else:
+                return cls.dict_playroom_to_game[playroom.name]
 
     @classmethod
-    def require_action(cls, func):
-        def wrapper(*args):
-            game_state = args[0]
-            if game_state.player_actions < Rules.max_actions:
-                dict_game_state_changes = func(*args)
-                game.players.increment_plater_action(game_state)
-                dict_game_state_changes['player_actions'] = game_state.player_actions
-                return dict_game_state_changes
-            raise errors.RequireAction
-
-        return wrapper
+    def delete_game(cls, playroom):
+        with cls.lock:
+            del cls.dict_playroom_to_game[playroom.name]
 
     @classmethod
-    def require_phase(cls, phase: Union[Hashable, Set]):
-        def decorator(func):
-            if isinstance(phase, set):
-                test = lambda game_state: game_state.phase in phase
-            else:
-                test = lambda game_state: game_state.phase == phase
-
-            def wrapper(*args):
-                game_state = args[0]
-                if not test(game_state):
-                    raise errors.InvalidGamePhase
-                return func(*args)
+    def get_game(cls, playroom) -> 'Game':
+        return cls.dict_playroom_to_game.get(playroom.name)
 
-            return wrapper
+    @classmethod
+    def start_game(cls, playroom):
+        with cls.store.lock(playroom.name):
+            game = cls.get_game(playroom)
+            if not game:
+                game = cls.register_game(playroom)
+            res_start = game.start_game()
+            cls.touch(playroom.name, game)
+        cls.evict()
+        return res_start
 
-        return decorator
+    @classmethod
+    @contextlib.contextmanager
+    def playing(cls, playroom):
+        # the commands of a room are applied one at a time, on its latest state whatever the worker
+        with cls.store.lock(playroom.name):
+            game = cls.load_game(playroom)
+            if game and cls.store.shared:
+                game.sync(cls.store)
+            if game:
+                cls.touch(playroom.name, game)
+            try:
+                yield game
+            finally:
+                if game:
+                    try:
+                        game.write_log()
+                    except Exception:
+                        logger.exception("log of room %s not written, it is written with its next command",
+                                         playroom.name)
+        cls.evict()
 
     @classmethod
-    def require_role(cls, role: Union[Hashable, Set]):
-        def decorator(func):
-            if isinstance(role, set):
-                test = lambda game_state: game_state.player_roles[game_state.current_player] in role
-            else:
-                test = lambda game_state: game_state.player_roles[game_state.current_player] == role
+    def acquire_resident_game(cls, room_name) -> 'Game':
+        # the event loop only plays the rooms in memory of a local store, and never waits for their lock
+        if cls.store.shared:
+            return None
+        game = cls.dict_playroom_to_game.get(room_name)
+        if game is None or not cls.store.try_acquire(room_name):
+            return None
+        if cls.dict_playroom_to_game.get(room_name) is not game:
+            cls.store.release(room_name)
+            return None
+        cls.touch(room_name, game)
+        return game
 
-            def wrapper(*args):
-                game_state = args[0]
-                if not test(game_state):
-                    raise errors.InvalidPlayer
-                return func(*args)
+    @classmethod
+    def release_resident_game(cls, room_name, game):
+        # what the commands left to write, for write_log: the room stays in memory until it is written
+        unwritten = game.take_unwritten()
+        if unwritten == ([], None):
+            unwritten = None
+        else:
+            with cls.lock:
+                game.writing += 1
+        cls.store.release(room_name)
+        return unwritten
 
-            return wrapper
+    @classmethod
+    def write_log(cls, game, unwritten):
+        try:
+            game.write_log(unwritten)
+        except Exception:
+            logger.exception("log of room %s not written, it is written with its next command", game.playroom.name)
+        finally:
+            with cls.lock:
+                game.writing -= 1
+        cls.evict()
 
-        return decorator
+    @classmethod
+    def touch(cls, room_name, game):
+        game.last_played = time.monotonic()
+        with cls.lock:
+            if cls.dict_playroom_to_game.get(room_name) is game:
+                cls.dict_playroom_to_game.move_to_end(room_name)
 
+    @classmethod
+    def must_evict(cls, game, now):
+        if game.writing:
+            return False
+        return len(cls.dict_playroom_to_game) > settings.GAME_MAX_ROOMS \
+               or now - game.last_played > settings.GAME_ROOM_TTL
 
-class AllGames:
-    dict_playroom_to_game = dict()
+    @classmethod
+    def evict(cls):
+        # the least recently played rooms over the room budget or idle for too long leave the memory,
+        # they are restored from their snapshot and log when they are played again
+        now = time.monotonic()
+        while True:
+            with cls.lock:
+                if not cls.dict_playroom_to_game:
+                    return
+                name, game = next(iter(cls.dict_playroom_to_game.items()))
+                if not cls.must_evict(game, now):
+                    return
+            with cls.store.lock(name):
+                with cls.lock:
+                    if cls.dict_playroom_to_game.get(name) is not game or not cls.must_evict(game, now):
+                        continue
+                    del cls.dict_playroom_to_game[name]
+                try:
+                    game.spill()
+                except Exception:
+                    # kept in memory with the log it could not write
+                    logger.exception("room %s not evicted, its log is not written", name)
+                    with cls.lock:
+                        cls.dict_playroom_to_game.setdefault(name, game)
+                    return
+                cls.metrics['evictions'] += 1
 
     @classmethod
-    def register_game(cls, playroom):
-        if playroom.name not in cls.dict_playroom_to_game:
-            new_game = Game(playroom)
-            cls.dict_playroom_to_game[playroom.name] = new_game
-            return new_game
-        else:
-            return cls.dict_playroom_to_game[playroom.name]
+    def get_metrics(cls):
+        return {
+            'resident_rooms': len(cls.dict_playroom_to_game),
+            'max_rooms': settings.GAME_MAX_ROOMS,
+            **cls.metrics,
+            'mean_restore_seconds': cls.metrics['restore_seconds'] / max(cls.metrics['restores'], 1),
+        }
 
     @classmethod
-    def delete_game(cls, playroom):
-        del cls.dict_playroom_to_game[playroom.name]
+    def load_game(cls, playroom, saved_game=None) -> 'Game':
+        # a started room missing from memory (worker restart) is rebuilt from its snapshot and log,
+        # once: the other requests of the room wait for it instead of loading it again
+        game = cls.get_game(playroom)
+        if game or not playroom.has_started:
+            return game
+        with cls.lock:
+            room_lock = cls.dict_playroom_to_lock[playroom.name]
+        with room_lock:
+            game = cls.get_game(playroom)
+            if not game:
+                start = time.perf_counter()
+                game = Game(playroom)
+                if cls.store.shared and cls.store.get_version(playroom.name) is not None:
+                    game.load_stored(*cls.store.load(playroom.name))
+                else:
+                    game.start_game(saved_game)
+                restore_seconds = time.perf_counter() - start
+                with cls.lock:
+                    cls.dict_playroom_to_game[playroom.name] = game
+                    cls.metrics['restores'] += 1
+                    cls.metrics['restore_seconds'] += restore_seconds
+                    cls.metrics['max_restore_seconds'] = max(cls.metrics['max_restore_seconds'], restore_seconds)
+        return game
 
     @classmethod
-    def get_game(cls, playroom) -> 'Game':
-        return cls.dict_playroom_to_game.get(playroom.name)
+    def warm_up(cls, n=settings.GAME_WARM_UP_ROOMS):
+        # loads the last played rooms before their players come back
+        if not n:
+            return
+        playroom_ids = controller.gamelog.get_recent_playroom_ids(n)
+        saved_games = controller.gamelog.get_saved_games(playroom_ids)
+        for playroom in PlayRoom.objects.filter(pk__in=saved_games).exclude(
+                phase__in=[PlayPhases.victory.value, PlayPhases.defeat.value]):
+            try:
+                cls.load_game(playroom, saved_games[playroom.pk])
+            except Exception:
+                traceback.print_exc()
+        close_old_connections()
 
     @classmethod
-    def start_game(cls, playroom):
-        game = cls.get_game(playroom)
-        if not game:
-            game = cls.register_game(playroom)
-        return game.start_game()
+    def warm_up_in_background(cls):
+        threading.Thread(target=cls.warm_up, name='game-warm-up', daemon=True).start()
 
     @classmethod
     def get_game_state(cls, playroom):
-        game = cls.get_game(playroom)
-        if not game and playroom.has_started:
-            cls.start_game(playroom)
-        if not game:
-            return {}
-        return cls.get_game(playroom).get_game_state()
+        with cls.playing(playroom) as game:
+            if not game:
+                return {}
+            return game.get_game_state()
 
     @classmethod
     def register_action(cls, playroom, player, game_action):
-        game = cls.get_game(playroom)
-        if not game:
-            raise errors.GameHasNotStarted
-        return game.register_action(player, game_action)
+        with cls.playing(playroom) as game:
+            if not game:
+                raise errors.GameHasNotStarted
+            return game.register_action(player, game_action)
 
     @classmethod
     def get_next_infections(cls, playroom, player, n=6, need_card=True):
-        game = cls.get_game(playroom)
-        if not game:
-            raise errors.GameHasNotStarted
-        return game.get_next_infections(player, n, need_card)
+        with cls.playing(playroom) as game:
+            if not game:
+                raise errors.GameHasNotStarted
+            return game.get_next_infections(player, n, need_card)
 
     @classmethod
     def set_next_infections(cls, playroom, player, cards):
-        game = cls.get_game(playroom)
-        if not game:
-            raise errors.GameHasNotStarted
-        return game.set_next_infections(player, cards)
+        with cls.playing(playroom) as game:
+            if not game:
+                raise errors.GameHasNotStarted
+            return game.set_next_infections(player, cards)
 
     @classmethod
     def cancel_last_action(cls, playroom, player):
-        game = cls.get_game(playroom)
-        return game.cancel_last_action(player)
+        with cls.playing(playroom) as game:
+            if not game:
+                raise errors.GameHasNotStarted
+            return game.cancel_last_action(player)
 
 
 class Game:
-    move_event = {'player_locations'}
-    heal_event = {'locations_disease_count', 'disease_status', 'phase'}
-    infection_event = {'infection_deck_count', 'infection_dump', 'locations_disease_count', 'disease_status',
-                       'outbreaks', 'epidemics', 'phase', 'current_player'}
-    drawn_location_event = {'player_hands', 'location_deck_count', 'epidemics', 'phase'}
-    dump_location_event = {'player_hands', 'location_dump', 'phase'}
-    build_event = {'locations_research_center', 'phase'}
-    cure_event = {'disease_status'}
-    give_card_event = ['player_hands', 'phase']
-    end_turn_event = {'player_actions', 'current_player', 'phase'}
-
-    @staticmethod
-    def events(*args):
-        for event in args:
-            for field in event:
-                yield field
 
     def __init__(self, playroom):
         self.playroom = playroom
         self.game_state = GameState(playroom)
-        self.backup_game_state = copy.copy(self.game_state)
-        self.actions = []
-
-    @GameTools.backup_point
-    def start_game(self):
+        self.undo_log = []
+        self.log_index = 0
+        self.snapshot_index = 0
+        self.turn_player = None
+        self.store_version = None
+        self.last_played = time.monotonic()
+        self.unwritten_entries = []
+        self.unwritten_snapshot = None
+        self.writing = 0
+
+    def start_game(self, saved_game=None):
+        if self.playroom.has_started and self.restore(saved_game):
+            self.mark()
+            return self.game_state.serialize()
+        # the room setup and the game draw from the same stream, a seed reproduces the whole game
+        rng = self.playroom.get_rng()
         if not self.playroom.has_started:
-            self._initialize_game(self.playroom)
+            self._initialize_game(self.playroom, rng)
             self.playroom.has_started = True
             self.playroom.save()
+            GameFlusher.forget(self.playroom)
+        self.game_state.rng = rng
         res_start = self.game_state.start_game()
+        self.undo_log = []
+        controller.gamelog.clear_game_log(self.playroom)
+        self.log_index = 0
+        self.save_snapshot()
+        if AllGames.store.shared:
+            self.store_base(AllGames.store)
+        self.mark()
         return res_start
 
-    def _initialize_game(self, playroom):
-        controller.cards.initial_location_cards_setup(playroom)
-        controller.cards.initial_infection_cards_setup(playroom)
+    def _initialize_game(self, playroom, rng):
+        controller.cards.initial_location_cards_setup(playroom, rng)
+        controller.cards.initial_infection_cards_setup(playroom, rng)
         controller.maplocations.initialize_map_states(playroom)
         controller.maplocations.initialize_infections(playroom)
         controller.players.initialize_player_location(playroom)
@@ -219,113 +314,224 @@ class Game:
         controller.players.initialize_player_order(playroom)
         controller.players.initialize_current_player(playroom)
 
+    def restore(self, saved_game=None):
+        # latest snapshot, then replay of the log entries written after it
+        if saved_game is None:
+            saved_game = controller.gamelog.get_saved_games([self.playroom.pk]).get(self.playroom.pk)
+        if saved_game is None:
+            return False
+        self.snapshot_index, dump, entries = saved_game
+        self.game_state.map_index = get_map_index(self.playroom)
+        self.game_state.load(dump)
+        self.undo_log = []
+        self.log_index = self.snapshot_index
+        for index, player, command, args in entries:
+            # a missing entry would replay another game
+            if index != self.log_index:
+                raise errors.GameLogIncomplete
+            self.replay(player, command, args)
+            self.log_index = index + 1
+        self.game_state.dirty = {}
+        self.game_state.infection_reports = []
+        return True
+
+    def sync(self, store):
+        # another worker may have played in the room since the last command of this one
+        version = store.get_version(self.playroom.name)
+        if version is None:
+            self.store_base(store)
+        elif version != self.store_version:
+            self.load_stored(*store.load(self.playroom.name))
+
+    def load_stored(self, version, base, tail):
+        self.game_state.map_index = get_map_index(self.playroom)
+        self.game_state.load(base['state'])
+        self.log_index, self.snapshot_index = base['log_index'], base['snapshot_index']
+        self.undo_log = []
+        for player, command, args in tail:
+            self.replay(player, command, args)
+            self.log_index += 1
+        self.game_state.dirty = {}
+        self.game_state.infection_reports = []
+        self.turn_player = self.game_state.current_player
+        self.store_version = version
+
+    def store_base(self, store):
+        base = {'state': self.game_state.dump(), 'log_index': self.log_index, 'snapshot_index': self.snapshot_index}
+        self.store_version = store.save(self.playroom.name, self.store_version, base)
+
+    def store_command(self, store, player, command, args):
+        # the commands which can still be cancelled are stored as they are, replaying them rebuilds the undo log
+        if self.undo_log:
+            self.store_version = store.append(self.playroom.name, self.store_version, [player, command, args])
+        else:
+            self.store_base(store)
+
+    def replay(self, player, command, args):
+        if command == 'action':
+            self._register_action(player, ACTIONS[args[0]](*args[1:]))
+        elif command == 'cancel':
+            self._cancel_last_action()
+        elif command == 'get_next_infections':
+            self._get_next_infections(player, *args)
+        elif command == 'set_next_infections':
+            self._set_next_infections(player, args)
+
+    def log(self, player, command, args):
+        # kept in memory until write_log, the commands never wait for the database
+        self.unwritten_entries.append((self.log_index, player, command, args))
+        self.log_index += 1
+        # the undo log is not in the snapshots, only take them when nothing can be cancelled
+        if not self.undo_log and self.log_index - self.snapshot_index >= settings.GAME_SNAPSHOT_INTERVAL:
+            self.take_snapshot()
+        if AllGames.store.shared:
+            self.store_command(AllGames.store, player, command, args)
+        self.mark()
+
+    def mark(self):
+        # the database rows are written behind, right away when a turn or the game ends
+        turn_boundary = self.game_state.current_player != self.turn_player \
+                        or self.game_state.phase in (PlayPhases.victory.value, PlayPhases.defeat.value)
+        self.turn_player = self.game_state.current_player
+        GameFlusher.mark(self.game_state, turn_boundary)
+
+    def spill(self):
+        # evicted from memory: the snapshot is brought up to date when nothing can be cancelled
+        if not self.undo_log and self.log_index > self.snapshot_index:
+            self.take_snapshot()
+        self.write_log()
+
+    def take_snapshot(self):
+        # encoded by write_log, out of the event loop for the rooms in memory
+        self.unwritten_snapshot = (self.log_index, self.game_state.snapshot())
+        self.snapshot_index = self.log_index
+
+    def save_snapshot(self):
+        self.take_snapshot()
+        self.write_log()
+
+    def take_unwritten(self):
+        unwritten = (self.unwritten_entries, self.unwritten_snapshot)
+        self.unwritten_entries, self.unwritten_snapshot = [], None
+        return unwritten
+
+    def write_log(self, unwritten=None):
+        entries, snapshot = self.take_unwritten() if unwritten is None else unwritten
+        if not entries and not snapshot:
+            return
+        try:
+            with transaction.atomic():
+                if entries:
+                    controller.gamelog.append_log_entries(self.playroom, entries)
+                if snapshot:
+                    log_index, game_state = snapshot
+                    controller.gamelog.save_snapshot(self.playroom, log_index, json.dumps(game_state.dump()))
+        except Exception:
+            # written again with the next ones, the log indices stay contiguous
+            self.unwritten_entries[:0] = entries
+            if self.unwritten_snapshot is None:
+                self.unwritten_snapshot = snapshot
+            raise
+
     def register_action(self, player, game_action: 'GameAction'):
-        dict_changes = self.apply_action(player, game_action)
-        if game_action.cancellable:
-            self.actions.append(game_action)
+        player_id = get_player_id(player)
+        dict_changes = self._register_action(player_id, game_action)
+        self.log(player_id, 'action', [type(game_action).__name__, *game_action.args])
+        return dict_changes
+
+    def _register_action(self, player, game_action: 'GameAction'):
+        cancellable = self.game_state.cancellable
+        game.history.start_journal(self.game_state, game_action.cancellable)
+        try:
+            dict_changes = self.apply_action(player, game_action)
+        except Exception:
+            game.history.undo(self.game_state, game.history.stop_journal(self.game_state))
+            self.game_state.cancellable = cancellable
+            raise
+        journal = game.history.stop_journal(self.game_state)
+        if self.game_state.cancellable:
+            self.undo_log.append(journal)
         else:
-            self.actions = []
-            self.do_backup()
+            self.undo_log = []
+        dict_changes['cancellable'] = self.game_state.cancellable
         return dict_changes
 
-    @GameTools.backup_point
     def get_next_infections(self, player, n, need_card):
-        next_infections = self.game_state.get_next_infections(get_player_id(player), n, need_card)
-        self.actions = []
+        player_id = get_player_id(player)
+        next_infections = self._get_next_infections(player_id, n, need_card)
+        self.log(player_id, 'get_next_infections', [n, need_card])
+        return next_infections
+
+    def _get_next_infections(self, player, n, need_card):
+        next_infections = self.game_state.get_next_infections(player, n, need_card)
+        self.undo_log = []
         return next_infections
 
-    @GameTools.backup_point
     def set_next_infections(self, player, cards):
-        self.actions = []
-        return self.game_state.set_next_infections(player, cards)
+        player_id = get_player_id(player)
+        dict_changes = self._set_next_infections(player_id, cards)
+        self.log(player_id, 'set_next_infections', list(cards))
+        return dict_changes
+
+    def _set_next_infections(self, player, cards):
+        self.undo_log = []
+        self.game_state.set_next_infections(player, cards)
+        return self.game_state.serialize_delta()
 
     def apply_action(self, player, game_action):
-        dict_game_state_changes = game_action.apply_to_game_state(get_player_id(player), self.game_state)
-        dict_game_state_changes['cancellable'] = game_action.cancellable
-        return dict_game_state_changes
+        self.game_state.infection_reports = []
+        game_action.apply_to_game_state(player, self.game_state)
+        return self.game_state.serialize_delta()
 
     @GameTools.require_phase(PlayPhases.player_action.value)
     def cancel_last_action(self, player):
         if player == self.game_state.current_player:
             raise errors.NotYourTurn
-        if self.actions:
-            self.actions.pop()
-        self.reload_backup()
-        for game_action in self.actions:
-            self.apply_action(player, game_action)
-        dict_state = self.game_state.serialize()
-        dict_state['cancellable'] = self.actions and self.actions[0].cancellable
-        return dict_state
+        if not self.undo_log:
+            return {'cancellable': False}
+        dict_changes = self._cancel_last_action()
+        self.log(get_player_id(player), 'cancel', [])
+        return dict_changes
+
+    def _cancel_last_action(self):
+        game.history.undo(self.game_state, self.undo_log.pop())
+        self.game_state.cancellable = bool(self.undo_log)
+        dict_changes = self.game_state.serialize_delta()
+        dict_changes['cancellable'] = self.game_state.cancellable
+        return dict_changes
 
     def get_game_state(self):
         return self.game_state.serialize()
 
-    def do_backup(self):
-        self.backup_game_state = copy.deepcopy(self.game_state)
-
-    def reload_backup(self):
-        self.game_state = copy.deepcopy(self.backup_game_state)
-
-
-def disease_status_adapter(game_state):
-    disease_count = game.diseases.get_disease_count(game_state)
-    return [{'type': d_type, 'count': d_count, 'status': game_state.disease_status.get(d_type)}
-            for d_type, d_count in disease_count.items()]
-
-
-class GameState:
-
-    def __init__(self, playroom):
-        self.serialization_fields = ['player_roles', 'player_locations', 'player_hands', 'locations_disease_count',
-                                     'locations_research_center', 'disease_status', 'location_deck_count',
-                                     'infection_deck_count',
-                                     'location_dump', 'infection_dump', 'epidemics', 'outbreaks',
-                                     'outbreaks', 'phase',
-                                     'epidemics_to_solve', 'player_actions', 'current_player', 'locations_types',
-                                     'cancellable']
-        self.serialization_adapters = {
-            'location_deck_count': lambda game_state: len(game_state.location_deck),
-            'infection_deck_count': lambda game_state: len(game_state.infection_deck),
-            'locations_disease_count': lambda game_state: [{'location': location,
-                                                            'diseases': [{'type': d_type, 'count': d_count}
-                                                                         for d_type, d_count in diseases.items()]}
-                                                           for location, diseases in
-                                                           game_state.locations_disease_count.items()],
-            'disease_status': disease_status_adapter
-        }
 
-        self.playroom = playroom
-        self.players = []
-        self.player_roles = dict()
-        self.player_locations = dict()
-        self.player_hands = dict()
-        self.locations_disease_count = dict()
-        self.locations_research_center = dict()
-        self.disease_status = dict()
-        self.location_deck = list()
-        self.infection_deck = list()
-        self.location_dump = list()
-        self.infection_dump = list()
-        self.epidemics = 0
-        self.outbreaks = 0
-        self.phase = PlayPhases.not_started.value
-        self.phase_on_hold = None
-        self.epidemics_to_solve = 0
-        self.player_actions = 0
-        self.location_network = None
-        self.current_player = None
-        self.locations_types = dict()
-        self.cancellable = False
-        self.nuit_tranquille = False
+class GameState(game.state.GameState):
+    # game state of a playroom, loaded from the database
+    __slots__ = ()
 
     def start_game(self):
+        self.map_index = get_map_index(self.playroom)
+        map_index = self.map_index
         self.players = controller.players.get_players(self.playroom)
         self.player_roles = controller.players.get_player_roles(self.playroom)
-        self.player_locations = controller.players.get_players_locations(self.playroom)
-        self.player_hands = controller.cards.get_players_hands(self.playroom)
-        self.locations_disease_count = controller.maplocations.get_disease_count(self.playroom)
-        self.locations_research_center = controller.maplocations.get_research_center(self.playroom)
-        self.disease_status = controller.maplocations.get_disease_status(self.playroom)
+        players_locations = controller.players.get_players_locations(self.playroom)
+        self.player_locations = [map_index.location_ids[players_locations[player]] for player in self.players]
+        players_hands = controller.cards.get_players_hands(self.playroom)
+        self.player_hands = {player: players_hands[player] for player in self.players}
+
+        self.locations_disease_count = bytearray(map_index.n_locations * map_index.n_diseases)
+        for location, diseases in controller.maplocations.get_disease_count(self.playroom).items():
+            for disease_type, count in diseases.items():
+                game.diseases.set_location_disease_count(self, map_index.location_ids[location],
+                                                         map_index.disease_ids[disease_type], count)
+        self.locations_research_center = 0
+        self.research_center_count = 0
+        for location, research_center in controller.maplocations.get_research_center(self.playroom).items():
+            if research_center:
+                self.locations_research_center |= 1 << map_index.location_ids[location]
+                self.research_center_count += 1
+        disease_status = controller.maplocations.get_disease_status(self.playroom)
+        self.disease_status = [disease_status[disease_type] for disease_type in map_index.diseases]
+
         self.location_deck = controller.cards.get_location_deck(self.playroom)
         self.infection_deck = controller.cards.get_infection_deck(self.playroom)
         self.location_dump = controller.cards.get_location_dump(self.playroom)
@@ -336,464 +542,9 @@ class GameState:
 
         self.epidemics_to_solve = self.playroom.epidemics_to_solve
         self.player_actions = self.playroom.player_actions
-        self.location_network = get_location_graph(self.playroom)
-        self.locations_types = get_location_types(self.playroom)
 
         self.current_player = get_player_id(self.playroom.current_player)
 
         self.nuit_tranquille = self.playroom.nuit_tranquille
+        self.dirty = {}
         return self.serialize()
-
-    def serialize(self):
-        return self.serialize_fields(self.serialization_fields)
-
-    def serialize_fields(self, fields):
-        return {
-            field: getattr(self, field)
-            if field not in self.serialization_adapters
-            else self.serialization_adapters[field](self)
-            for field in fields
-        }
-
-    def hold_phase(self, new_phase):
-        self.phase_on_hold = self.phase
-        self.phase = new_phase
-
-    def resume_phase(self):
-        if not self.phase_on_hold:
-            self.phase = PlayPhases.player_action
-        else:
-            self.phase = self.phase_on_hold
-            self.phase_on_hold = None
-        return self.phase
-
-    @GameStateTools.check_endgame
-    @GameStateTools.require_current_player
-    @GameStateTools.require_action
-    @GameStateTools.require_phase(PlayPhases.player_action.value)
-    def move(self, player, moving_player, to_location):
-        is_repartiteuse = game.players.is_repartiteuse(self, player)
-        if not (player == moving_player or is_repartiteuse):
-            raise errors.CannotMoveOthers
-        player_location = game.players.get_player_location(self, moving_player)
-        if not game.locations.is_neighbor(self, player_location, to_location):
-            players_at_to_location = list(
-                filter(lambda location: location == to_location, self.player_locations.values()))
-            if not (is_repartiteuse and players_at_to_location):
-                raise errors.NotANeighbor
-        return self._do_move(moving_player, to_location)
-
-    def _do_move(self, moving_player, to_location):
-        game.players.set_player_location(self, moving_player, to_location)
-        if game.players.is_medecin(self, moving_player):
-            game.diseases.auto_cure_diseases(self, to_location)
-            return self.serialize_fields(Game.events(Game.move_event, Game.heal_event))
-        return self.serialize_fields(Game.move_event)
-
-    def pont_aerien(self, player, moving_player, location):
-        game.cards.use_card(self, player, CardEvent.pont.value)
-        dict_changes = self._do_move(moving_player, location)
-        self.check_dump_phase()
-        dict_change_hand = self.serialize_fields(Game.dump_location_event)
-        dict_changes.update(dict_change_hand)
-        return dict_changes
-
-    def play_population_resiliente(self, player, infection_card):
-        game.cards.use_card(self, player, CardEvent.population.value)
-        try:
-            self.infection_dump.remove(infection_card)
-        except:
-            raise errors.NoSuchCard
-        self.check_dump_phase()
-        return self.serialize_fields(Game.events(Game.infection_event, Game.dump_location_event))
-
-    def get_next_infections(self, player, n, need_card):
-        if need_card:
-            game.cards.use_card(self, player, CardEvent.prevision.value)
-            self.check_dump_phase()
-        if self.phase == PlayPhases.solve_epidemic.value:
-            game.infections.shuffle_infection_dump(self)
-
-        next_infections = self.infection_deck[-n:]
-        next_infections.reverse()
-        return next_infections
-
-    def set_next_infections(self, player, cards):
-        max_cards = 6
-        if len(cards) > max_cards:
-            raise errors.TooManyCards
-
-        set_top_deck = set(self.infection_deck[-len(cards):])
-        for card in cards:
-            if not card in set_top_deck:
-                raise errors.InvalidCard
-        self.infection_deck[-len(cards):] = cards[::-1]
-        return self.serialize_fields(Game.events(Game.dump_location_event, Game.infection_event))
-
-    def play_nuit_tranquille(self, player):
-        game.cards.use_card(self, player, CardEvent.nuit.value)
-        self.nuit_tranquille = True
-        self.check_dump_phase()
-        return self.serialize_fields(Game.dump_location_event)
-
-    @GameStateTools.check_endgame
-    @GameStateTools.require_current_player
-    @GameStateTools.require_action
-    @GameStateTools.require_phase(PlayPhases.player_action.value)
-    def heal(self, player, disease_type=None):
-        player_location = game.players.get_player_location(self, player)
-        if not disease_type in self.disease_status:
-            disease_type = game.diseases.get_disease_to_heal(self, player_location)
-        number_of_disease_to_heal = game.diseases.get_number_of_disease_to_heal(self, player, player_location,
-                                                                                disease_type)
-        game.diseases.remove_disease_from_location(self, player_location, disease_type, number_of_disease_to_heal)
-        return self.serialize_fields(Game.heal_event)
-
-    @GameStateTools.require_phase(PlayPhases.dump_card.value)
-    def dump_card(self, player, *cards):
-        for card in cards:
-            game.cards.dump_card(self, player, card)
-            if not game.cards.player_hand_limit(self, player):
-                break
-        new_phase = self.check_dump_phase()
-        dict_change = self.serialize_fields(Game.dump_location_event)
-        if new_phase == PlayPhases.end_turn.value:
-            dict_end_turn = self.end_turn(player)
-            dict_change.update(dict_end_turn)
-        return dict_change
-
-    def check_dump_phase(self):
-        if self.phase == PlayPhases.dump_card.value:
-            if game.cards.any_player_hand_limit(self):
-                self.phase = PlayPhases.dump_card.value
-            else:
-                return self.resume_phase()
-
-    @GameStateTools.check_endgame
-    @GameStateTools.require_current_player
-    @GameStateTools.require_action
-    @GameStateTools.require_phase(PlayPhases.player_action.value)
-    def move_to_location(self, player, to_location, card_to_use):
-        game.cards.use_card(self, player, card_to_use)
-        game.players.set_player_location(self, player, to_location)
-        dict_change = self._do_move(player, to_location)
-        dict_change.update(self.serialize_fields(Game.dump_location_event))
-        return dict_change
-
-    @GameStateTools.require_role(PlayerRolesEnum.expert.value)
-    def move_to_locationexpert(self, player, to_location, card_to_use):
-        return self.move_to_location(player, to_location, card_to_use)
-
-    @GameStateTools.check_endgame
-    @GameStateTools.require_current_player
-    @GameStateTools.require_action
-    @GameStateTools.require_phase(PlayPhases.player_action.value)
-    def move_from_location(self, player, to_location):
-        player_location = game.players.get_player_location(self, player)
-        game.cards.use_card(self, player, player_location)
-        dict_change = self._do_move(player, to_location)
-        dict_change.update(self.serialize_fields(Game.dump_location_event))
-        return dict_change
-
-    @GameStateTools.require_current_player
-    @GameStateTools.require_action
-    @GameStateTools.require_phase(PlayPhases.player_action.value)
-    def build_research_center(self, player):
-        player_location = game.players.get_player_location(self, player)
-        game.locations.check_build_research_center(self, player_location)
-        if not game.players.is_expert(self, player):
-            game.cards.use_card(self, player, player_location)
-        return self._do_build_research_center(player, player_location)
-
-    def _do_build_research_center(self, player, player_location):
-        game.locations.build_research_center(self, player, player_location)
-        if len(self.locations_research_center) >= Rules.max_research_centers:
-            self.hold_phase(PlayPhases.destroy_research_center.value)
-        return self.serialize_fields(Game.events(Game.dump_location_event, Game.build_event))
-
-    def subvention_publique(self, player, location):
-        game.cards.use_card(self, player, CardEvent.subvention.value)
-        self.check_dump_phase()
-        return self._do_build_research_center(player, location)
-
-    @GameStateTools.require_current_player
-    @GameStateTools.require_phase(PlayPhases.destroy_research_center.value)
-    def destroy_research_center(self, player, location):
-        if self.locations_research_center.get(location):
-            game.locations.destroy_research_center(self, location)
-        if len(self.locations_research_center) >= Rules.max_research_centers:
-            self.hold_phase(PlayPhases.destroy_research_center.value)
-        else:
-            self.resume_phase()
-        return self.serialize_fields(Game.build_event)
-
-    @GameStateTools.check_endgame
-    @GameStateTools.require_current_player
-    @GameStateTools.require_action
-    @GameStateTools.require_phase(PlayPhases.player_action.value)
-    def cure_disease(self, player, cards):
-        game.diseases.cure_disease(self, player, cards)
-        return self.serialize_fields(Game.events(Game.dump_location_event, Game.cure_event))
-
-    @GameStateTools.require_action
-    @GameStateTools.require_phase(PlayPhases.player_action.value)
-    def give_card(self, player, player_from, player_to, card):
-        if not (self.current_player == player_from or self.current_player == player_to):
-            raise errors.InvalidPlayer
-        game.cards.check_give_card(self, player_from, player_to, card)
-        game.cards.give_card(self, player_from, player_to, card)
-        if game.cards.player_hand_limit(self, player_to):
-            self.hold_phase(PlayPhases.dump_card.value)
-        return self.serialize_fields(Game.give_card_event)
-
-    @GameStateTools.check_endgame
-    @GameStateTools.require_current_player
-    @GameStateTools.require_phase(
-        {PlayPhases.player_action.value, PlayPhases.solve_epidemic.value, PlayPhases.end_turn.value})
-    def end_turn(self, player):
-        if self.phase == PlayPhases.player_action.value and self.player_actions < Rules.max_actions:
-            raise errors.ActionRemainig
-        if self.phase == PlayPhases.player_action.value:
-            drawn_cards = game.cards._draw_locations_cards(self)
-            epidemic_to_solve = game.cards.add_cards_to_hand_epidemic(self, player, drawn_cards)
-            self.epidemics_to_solve = epidemic_to_solve
-            self.epidemics += epidemic_to_solve
-            self.phase = PlayPhases.end_turn.value
-
-        if game.cards.player_hand_limit(self, player):
-            self.hold_phase(PlayPhases.dump_card.value)
-            return self.serialize_fields(Game.events(Game.end_turn_event, Game.drawn_location_event))
-
-        if self.epidemics_to_solve:
-            self.phase = PlayPhases.solve_epidemic.value
-            game.infections.solve_epidemic(self)
-            return self.serialize_fields(
-                Game.events(Game.end_turn_event, Game.drawn_location_event, Game.infection_event))
-
-        if self.phase == PlayPhases.solve_epidemic.value:
-            game.infections.shuffle_infection_dump(self)
-
-        if not self.nuit_tranquille:
-            game.infections.infections(self)
-
-        self.phase = PlayPhases.player_action.value
-        self.nuit_tranquille = False
-        self.current_player = game.players.next_player(self)
-        self.player_actions = 0
-        return self.serialize_fields(Game.events(Game.end_turn_event, Game.drawn_location_event, Game.infection_event))
-
-    @GameStateTools.check_endgame
-    @GameStateTools.require_current_player
-    @GameStateTools.require_phase(PlayPhases.solve_epidemic.value)
-    def trigger_infections(self, player):
-        if self.epidemics_to_solve <= 0:
-            self.epidemics_to_solve = 0
-            game.infections.infections(self)
-        else:
-            game.infections.solve_epidemic(self)
-        return self.serialize_fields(Game.infection_event)
-
-
-class GameAction:
-    def __init__(self):
-        self.cancellable = []
-        self.args = []
-
-    @abstractmethod
-    def apply_to_game_state(self, player, game_state):
-        pass
-
-
-class Move(GameAction):
-
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if len(self.args) == 1 or not self.args[1]:
-            return game_state.move(player, player, self.args[0])
-        return game_state.move(player, self.args[0], self.args[1])
-
-
-class Heal(GameAction):
-
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        return game_state.heal(player, self.args[0])
-
-
-class EndTurn(GameAction):
-
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.cancellable = False
-
-    def apply_to_game_state(self, player, game_state):
-        return game_state.end_turn(player)
-
-
-class DumpCard(GameAction):
-
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if len(self.args) == 1 or not self.args[1]:
-            return game_state.dump_card(player, self.args[0])
-        return game_state.dump_card(player, self.args[0], self.args[1])
-
-
-class MoveToLocation(GameAction):
-
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if self.args:
-            return game_state.move_to_location(player, self.args[0], self.args[0])
-        raise errors.NoSuchCard
-
-
-class MoveToLocationExpert(GameAction):
-
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if self.args and len(self.args) == 2:
-            return game_state.move_to_locationexpert(player, self.args[0], self.args[1])
-        raise errors.NoSuchCard
-
-
-class MoveFromLocation(GameAction):
-
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if self.args:
-            return game_state.move_from_location(player, self.args[0])
-        raise errors.NoSuchCard
-
-
-class BuildResearchCenter(GameAction):
-
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        return game_state.build_research_center(player)
-
-
-class DestroyResearchCenter(GameAction):
-
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if self.args:
-            return game_state.destroy_research_center(player, self.args[0])
-        raise errors.NoResearchCenterPresent
-
-
-class CureDisease(GameAction):
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if self.args:
-            return game_state.cure_disease(player, self.args)
-        raise errors.NoDisease
-
-
-class GiveCard(GameAction):
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if self.args and len(self.args) == 3:
-            return game_state.give_card(player, *self.args)
-        raise errors.CannotGiveCard
-
-
-class Subvention(GameAction):
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if self.args:
-            return game_state.subvention_publique(player, self.args[0])
-        raise errors.NoSuchLocation
-
-
-class PontAerien(GameAction):
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if self.args and len(self.args) == 2:
-            return game_state.pont_aerien(player, self.args[1], self.args[0])
-        raise errors.NoSuchLocation
-
-
-class NuitTranquille(GameAction):
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        return game_state.play_nuit_tranquille(player)
-
-
-class PopulationResiliente(GameAction):
-    def __init__(self, *args):
-        GameAction.__init__(self)
-        self.args = args
-        self.cancellable = True
-
-    def apply_to_game_state(self, player, game_state):
-        if self.args:
-            return game_state.play_population_resiliente(player, self.args[0])
-        raise errors.NoSuchCard
-
-
-EVENTS = {
-    CardEvent.subvention.value: Subvention,
-    CardEvent.pont.value: PontAerien,
-    CardEvent.nuit.value: NuitTranquille,
-    CardEvent.population.value: PopulationResiliente
-
-}
-
-
-def get_event_class(event_type):
-    if event_type not in EVENTS:
-        raise errors.NoSuchEvent
-    return EVENTS[event_type]
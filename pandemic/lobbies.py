@@ -0,0 +1,99 @@
+import secrets
+import threading
+from collections import OrderedDict
+
+from pandemic.controller.rooms import get_player_status, get_playroom_state
+from pandemic.frames import frame_event
+
+# tells the changes of a worker from those of the other workers of the room group
+WORKER = secrets.token_hex(8)
+
+
+class Lobby:
+    # players of a room as shown to its sockets, every change bumps the version
+    __slots__ = ('version', 'players', 'has_started', 'worker_versions')
+
+    def __init__(self, players, has_started):
+        self.version = 0
+        self.players = OrderedDict((status['name'], status) for status in players)
+        self.has_started = has_started
+        self.worker_versions = dict()
+
+    def apply(self, patch, version=None):
+        # patch: {'players': {name: status, or None once removed}, 'has_started': bool}
+        for name, status in patch.get('players', {}).items():
+            if status is None:
+                self.players.pop(name, None)
+            else:
+                self.players[name] = status
+        if 'has_started' in patch:
+            self.has_started = patch['has_started']
+        self.version = max(self.version + 1, version or 0)
+
+    def apply_remote(self, patch, version, worker):
+        # every consumer of the room gets the patch of another worker, it is applied once
+        if version > self.worker_versions.get(worker, 0):
+            self.worker_versions[worker] = version
+            self.apply(patch, version)
+
+    def free_player_patch(self, name):
+        # same as controller.players.free_player
+        status = self.players.get(name)
+        if status is None or not self.has_started:
+            return {'players': {name: None}}
+        return {'players': {name: {**status, 'taken': False, 'is_ready': False}}}
+
+    def serialize(self):
+        return {
+            'version': self.version,
+            'players': list(self.players.values()),
+            'has_started': self.has_started,
+        }
+
+    def event(self, patch=None, encoder=None):
+        # the frame of the lobby is encoded once for the whole room group, see PlayConsumer.playroomstate
+        return {
+            **frame_event('playroomstate', self.serialize(), encoder),
+            'type': 'playroomstate',
+            'version': self.version,
+            'patch': patch,
+            'worker': WORKER,
+        }
+
+
+def player_patch(*players):
+    return {'players': {player.name: get_player_status(player) for player in players}}
+
+
+class AllLobbies:
+    # lobbies of the rooms with sockets on this worker: loaded once from the database, then changed
+    # in memory by the consumers changing a player, and by the patches other workers broadcast
+    dict_room_to_lobby = dict()
+    dict_room_to_consumers = dict()
+    lock = threading.Lock()
+
+    @classmethod
+    def get_lobby(cls, room_name) -> Lobby:
+        return cls.dict_room_to_lobby.get(room_name)
+
+    @classmethod
+    def load_lobby(cls, playroom) -> Lobby:
+        playroom_state = get_playroom_state(playroom)
+        lobby = Lobby(playroom_state['players'], playroom_state['has_started'])
+        with cls.lock:
+            return cls.dict_room_to_lobby.setdefault(playroom.name, lobby)
+
+    @classmethod
+    def connect(cls, room_name):
+        with cls.lock:
+            cls.dict_room_to_consumers[room_name] = cls.dict_room_to_consumers.get(room_name, 0) + 1
+
+    @classmethod
+    def disconnect(cls, room_name):
+        # a lobby is not kept without sockets, it would miss the changes of the other workers
+        with cls.lock:
+            consumers = cls.dict_room_to_consumers.pop(room_name, 0) - 1
+            if consumers > 0:
+                cls.dict_room_to_consumers[room_name] = consumers
+            else:
+                cls.dict_room_to_lobby.pop(room_name, None)
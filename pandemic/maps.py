@@ -0,0 +1,81 @@
+from typing import Dict
+
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from pandemic.game.maps import MapIndex
+from pandemic.models import Map, MapLocation
+
+
+class LoadedMap:
+    # read only, shared by every room playing on the map
+    __slots__ = ('map_index', 'location_pks', 'pk_locations', 'starting_location', 'locations_setup')
+
+    def __init__(self, map_index: MapIndex, location_pks, starting_location):
+        self.map_index = map_index
+        self.location_pks = tuple(location_pks)
+        self.pk_locations = {pk: location for location, pk in enumerate(self.location_pks)}
+        self.starting_location = starting_location
+        self.locations_setup = {
+            name: {
+                'name': name,
+                'location_type': map_index.diseases[map_index.locations_types[location]],
+                'population': map_index.populations[location],
+                'x': map_index.coordinates[location][0],
+                'y': map_index.coordinates[location][1],
+                'neighbors': [map_index.locations[neighbor] for neighbor in map_index.neighbors[location]]
+            } for location, name in enumerate(map_index.locations)
+        }
+
+    def location_pk(self, name):
+        return self.location_pks[self.map_index.location_id(name)]
+
+    def location_name(self, pk):
+        return self.map_index.locations[self.pk_locations[pk]]
+
+
+class AllMaps:
+    dict_map_to_loaded_map: Dict[int, LoadedMap] = dict()
+
+    @classmethod
+    def get_map(cls, map_id) -> LoadedMap:
+        loaded_map = cls.dict_map_to_loaded_map.get(map_id)
+        if loaded_map is None:
+            loaded_map = cls.load_map(map_id)
+            cls.dict_map_to_loaded_map[map_id] = loaded_map
+        return loaded_map
+
+    @classmethod
+    def load_map(cls, map_id) -> LoadedMap:
+        starting_location = Map.objects.filter(pk=map_id).values_list('starting_location', flat=True).first()
+        all_locations = MapLocation.objects.filter(map_id=map_id).order_by('id') \
+            .values_list('id', 'name', 'location_type', 'population', 'x', 'y')
+        names = {pk: name for pk, name, *_ in all_locations}
+        links = [(names[loc_from], names[loc_to]) for loc_from, loc_to in
+                 MapLocation.neighbors.through.objects.filter(from_maplocation__map_id=map_id)
+                     .values_list('from_maplocation_id', 'to_maplocation_id')]
+        map_index = MapIndex({name: location_type for _, name, location_type, *_ in all_locations}, links,
+                             populations={name: population for _, name, _, population, *_ in all_locations},
+                             coordinates={name: (x, y) for _, name, _, _, x, y in all_locations})
+        starting_location = map_index.location_ids.get(names.get(starting_location))
+        return LoadedMap(map_index, names, starting_location)
+
+    @classmethod
+    def invalidate(cls, map_id=None):
+        if map_id is None:
+            cls.dict_map_to_loaded_map.clear()
+        else:
+            cls.dict_map_to_loaded_map.pop(map_id, None)
+
+
+@receiver(post_save, sender=Map)
+@receiver(post_delete, sender=Map)
+def invalidate_map(sender, instance, **kwargs):
+    AllMaps.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=MapLocation)
+@receiver(post_delete, sender=MapLocation)
+@receiver(m2m_changed, sender=MapLocation.neighbors.through)
+def invalidate_map_location(sender, instance, **kwargs):
+    AllMaps.invalidate(instance.map_id if isinstance(instance, MapLocation) else None)
@@ -0,0 +1,19 @@
+# Generated by Django 3.0.6 on 2026-10-18 10:12
+
+from django.db import migrations, models
+import pandemic.models.playroom
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pandemic', '0007_playroom_nuit_tranquille'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playroom',
+            name='seed',
+            field=models.BigIntegerField(default=pandemic.models.playroom.new_seed),
+        ),
+    ]
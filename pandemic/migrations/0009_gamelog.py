@@ -0,0 +1,41 @@
+# Generated by Django 3.0.6 on 2026-10-18 16:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pandemic', '0008_playroom_seed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('log_index', models.IntegerField()),
+                ('state', models.TextField()),
+                ('playroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='pandemic.PlayRoom')),
+            ],
+            options={
+                'ordering': ['log_index'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GameLogEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.IntegerField()),
+                ('player', models.CharField(max_length=64)),
+                ('command', models.CharField(max_length=32)),
+                ('args', models.TextField(default='[]')),
+                ('playroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_entries', to='pandemic.PlayRoom')),
+            ],
+            options={
+                'ordering': ['index'],
+                'unique_together': {('playroom', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.6 on 2026-10-18 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pandemic', '0009_gamelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='channel_name',
+            field=models.CharField(blank=True, default=None, max_length=128, null=True),
+        ),
+    ]
@@ -6,4 +6,5 @@ from .playroom import PlayRoom
 from .disease import Disease, DiseaseStatus
 from .cards_infection import CardInfection
 from .cards_location import CardLocation
-from .cards_location_deck import CardsLocationDeck
\ No newline at end of file
+from .cards_location_deck import CardsLocationDeck
+from .gamelog import GameLogEntry, GameSnapshot
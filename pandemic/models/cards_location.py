@@ -1,28 +1,6 @@
-import enum
-
 from django.db import models
 
-
-class CardPosition(enum.Enum):
-    hand = 'hand'
-    special = 'special'
-    deck = 'deck'
-    dump = 'dump'
-    removed = 'removed'
-
-
-class CardEvent(enum.Enum):
-    pont = 'Pont Aérien'
-    subvention = "Subvention Publique"
-    nuit = "Nuit Tranquille"
-    population = "Population Résiliente"
-    prevision = "Prévision"
-
-
-class CardType(enum.Enum):
-    epidemic = 'epidemic'
-    location = 'location'
-    event = 'event'
+from pandemic.enums import CardPosition, CardEvent, CardType
 
 
 class CardLocation(models.Model):
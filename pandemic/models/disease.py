@@ -1,12 +1,6 @@
-import enum
-
 from django.db import models
 
-
-class DiseaseStatusEnum(enum.Enum):
-    ongoing = "ongoing"
-    cured = "cured"
-    eradicated = "eradicated"
+from pandemic.enums import DiseaseStatusEnum
 
 
 class DiseaseStatus(models.Model):
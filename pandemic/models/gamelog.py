@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class GameLogEntry(models.Model):
+    # append only, one entry per accepted command of a started game
+    playroom = models.ForeignKey('PlayRoom', related_name='log_entries', on_delete=models.CASCADE)
+    index = models.IntegerField()
+    player = models.CharField(max_length=64)
+    command = models.CharField(max_length=32)
+    args = models.TextField(default='[]')
+
+    class Meta:
+        ordering = ['index']
+        unique_together = ['playroom', 'index']
+
+
+class GameSnapshot(models.Model):
+    # GameState.dump once the first log_index entries are applied
+    playroom = models.ForeignKey('PlayRoom', related_name='snapshots', on_delete=models.CASCADE)
+    log_index = models.IntegerField()
+    state = models.TextField()
+
+    class Meta:
+        ordering = ['log_index']
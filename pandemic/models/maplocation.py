@@ -1,18 +1,6 @@
-import enum
-
 from django.db import models
 
-
-class LocationType(enum.Enum):
-    black = "black"
-    blue = "blue"
-    red = "red"
-    yellow = "yellow"
-
-
-class LocationLinkTypes(enum.Enum):
-    neighbor = 0
-    research_center = 1
+from pandemic.enums import LocationType, LocationLinkTypes
 
 
 serialization_fields = ["name", "location_type", "population", "x", "y"]
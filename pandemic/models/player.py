@@ -1,16 +1,6 @@
-import enum
-
 from django.db import models
 
-
-class PlayerRolesEnum(enum.Enum):
-    medecin = "medecin"
-    planificateur = "planificateur"
-    repartiteuse = "repartiteuse"
-    scientifique = "scientifique"
-    expert = "expert"
-    specialiste = "specialiste"
-    chercheuse = "chercheuse"
+from pandemic.enums import PlayerRolesEnum
 
 
 class Player(models.Model):
@@ -24,3 +14,5 @@ class Player(models.Model):
                                  blank=True,
                                  default=None)
     playroom = models.ForeignKey('PlayRoom', related_name='players', on_delete=models.CASCADE)
+    # websocket channel of the consumer playing this player, to send it the messages meant for it only
+    channel_name = models.CharField(max_length=128, null=True, blank=True, default=None)
@@ -1,17 +1,13 @@
-import enum
+import random
+import secrets
 
 from django.db import models
 
+from pandemic.enums import PlayPhases
 
-class PlayPhases(enum.Enum):
-    end_turn = "end_turn"
-    not_started = "not_started"
-    player_action = "player_action"
-    dump_card = "dump_card"
-    solve_epidemic = "solve_epidemic"
-    defeat = "defeat"
-    victory = "victory"
-    destroy_research_center = 'destroy'
+
+def new_seed():
+    return secrets.randbits(63)
 
 
 class PlayRoom(models.Model):
@@ -26,8 +22,13 @@ class PlayRoom(models.Model):
     current_player = models.ForeignKey('Player', null=True, default=None, on_delete=models.SET_DEFAULT,
                                        related_name="current_player")
     nuit_tranquille = models.BooleanField(default=False)
+    # every shuffle of the room is drawn from random.Random(seed)
+    seed = models.BigIntegerField(default=new_seed)
 
     def get_infections_number(self):
         infections = [2, 2, 3, 3, 3, 4, 4]
         return infections[self.epidemics]
 
+    def get_rng(self):
+        return random.Random(self.seed)
+
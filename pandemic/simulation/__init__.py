@@ -0,0 +1,3 @@
+from pandemic.simulation.simulator import GameResult, load_map, new_game, play_action, run_game
+from pandemic.simulation.policies import Policy, RandomPolicy, ScriptedPolicy
+from pandemic.simulation.batch import BatchSummary, run_batch, summarize
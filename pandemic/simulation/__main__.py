@@ -0,0 +1,34 @@
+"""
+Headless self-play, without Django.
+
+    python -m pandemic.simulation [--games 1000] [--seed 0] [--workers 8] [--rule max_outbreaks=7 ...]
+                                  [--roles medecin,scientifique,specialiste,expert]
+"""
+import argparse
+import ast
+import json
+
+from pandemic.simulation.batch import run_batch, summarize
+from pandemic.simulation.simulator import DEFAULT_ROLES
+
+
+def parse_rule(rule):
+    name, _, value = rule.partition('=')
+    return name, ast.literal_eval(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run complete games with a random policy.')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='default: one per core')
+    parser.add_argument('--rule', type=parse_rule, action='append', default=[], help='Rules override, name=value')
+    parser.add_argument('--roles', default=','.join(DEFAULT_ROLES))
+    args = parser.parse_args()
+
+    results = run_batch(args.games, args.seed, args.workers, dict(args.rule), roles=args.roles.split(','))
+    print(json.dumps(summarize(results).serialize(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
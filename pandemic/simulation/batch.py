@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+from collections import Counter
+from typing import Dict, Iterator, List
+
+from pandemic.game.rules import Rules
+from pandemic.simulation.policies import RandomPolicy
+from pandemic.simulation.simulator import GameResult, load_map, run_game, DEFAULT_ROLES, LOCATIONS_CSV, \
+    CONNECTIONS_CSV
+
+_worker = {}
+
+
+class BatchSummary:
+    # only integer sums are kept, merging the results in any order gives the same summary
+    counted_fields = ('turns', 'actions', 'invalid_actions', 'outbreaks', 'epidemics', 'cured')
+
+    def __init__(self):
+        self.games = 0
+        self.outcomes = Counter()
+        self.defeats = Counter()
+        self.sums = Counter()
+
+    def add(self, result: GameResult):
+        self.games += 1
+        self.outcomes[result.outcome] += 1
+        if result.defeat:
+            self.defeats[result.defeat] += 1
+        for field in self.counted_fields:
+            self.sums[field] += getattr(result, field)
+
+    def merge(self, other: 'BatchSummary'):
+        self.games += other.games
+        self.outcomes.update(other.outcomes)
+        self.defeats.update(other.defeats)
+        self.sums.update(other.sums)
+
+    @property
+    def win_rate(self):
+        return self.outcomes['victory'] / self.games if self.games else 0.
+
+    def mean(self, field):
+        return self.sums[field] / self.games if self.games else 0.
+
+    def serialize(self):
+        return {
+            'games': self.games,
+            'win_rate': self.win_rate,
+            'outcomes': dict(self.outcomes),
+            'defeats': dict(self.defeats),
+            'means': {field: self.mean(field) for field in self.counted_fields}
+        }
+
+
+def check_rules(rules: Dict):
+    for name in rules:
+        if name.startswith('_') or not hasattr(Rules, name):
+            raise ValueError('Unknown rule {}'.format(name))
+
+
+def set_rules(rules: Dict):
+    check_rules(rules)
+    for name, value in rules.items():
+        setattr(Rules, name, value)
+
+
+def _init_worker(rules, policy_class, roles, locations_path, connections_path):
+    set_rules(rules)
+    _worker['map_index'] = load_map(locations_path, connections_path)
+    _worker['policy_class'] = policy_class
+    _worker['roles'] = roles
+
+
+def _run_seed(seed) -> GameResult:
+    return run_game(_worker['map_index'], _worker['policy_class'](), seed, _worker['roles'])
+
+
+def run_batch(games, seed=0, workers=None, rules: Dict = None, policy_class=RandomPolicy,
+              roles: List[str] = DEFAULT_ROLES, locations_path=LOCATIONS_CSV, connections_path=CONNECTIONS_CSV,
+              chunksize=64) -> Iterator[GameResult]:
+    # game number i is always played from seed + i and results come back in seed order,
+    # whatever the number of workers
+    check_rules(rules or {})
+    seeds = range(seed, seed + games)
+    initargs = (rules or {}, policy_class, list(roles), locations_path, connections_path)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        saved_rules = {name: getattr(Rules, name) for name in (rules or {})}
+        _init_worker(*initargs)
+        try:
+            yield from map(_run_seed, seeds)
+        finally:
+            set_rules(saved_rules)
+        return
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        yield from pool.imap(_run_seed, seeds, chunksize=chunksize)
+
+
+def summarize(results) -> BatchSummary:
+    summary = BatchSummary()
+    for result in results:
+        summary.add(result)
+    return summary
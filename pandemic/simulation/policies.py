@@ -0,0 +1,67 @@
+from collections import defaultdict
+
+from pandemic.enums import PlayPhases
+from pandemic.game import cards, diseases, locations, players
+from pandemic.game.actions import GameAction, EndTurn, DumpCard, DestroyResearchCenter, Move, Heal, CureDisease, \
+    GiveCard, BuildResearchCenter, MoveToLocation
+from pandemic.game.rules import Rules
+
+
+class Policy:
+    def choose_action(self, game_state, rng):
+        # returns (player, GameAction), or None to stop the game
+        raise NotImplementedError
+
+
+class ScriptedPolicy(Policy):
+    def __init__(self, script):
+        self.script = iter(script)
+
+    def choose_action(self, game_state, rng):
+        return next(self.script, None)
+
+
+class RandomPolicy(Policy):
+    # plays the mandatory actions of the phase, and a random plausible action otherwise
+    def choose_action(self, game_state, rng):
+        phase = game_state.phase
+        player = game_state.current_player
+        if phase == PlayPhases.dump_card.value:
+            for player, hand in game_state.player_hands.items():
+                if cards.player_hand_limit(game_state, player):
+                    return player, DumpCard(rng.choice(hand))
+        if phase == PlayPhases.destroy_research_center.value:
+            research_centers = [location for location in range(game_state.map_index.n_locations)
+                                if locations.has_research_center(game_state, location)]
+            return player, DestroyResearchCenter(
+                locations.get_location_card(game_state, rng.choice(research_centers)))
+        if phase != PlayPhases.player_action.value or game_state.player_actions >= Rules.max_actions:
+            return player, EndTurn()
+        return player, rng.choice(self.player_actions(game_state, player))
+
+    def player_actions(self, game_state, player):
+        map_index = game_state.map_index
+        location = players.get_player_location(game_state, player)
+        hand = game_state.player_hands[player]
+        location_cards = [card for card in hand if card in map_index.location_ids]
+
+        game_actions = [Move(map_index.locations[neighbor]) for neighbor in locations.get_neighbors(game_state, location)]
+        game_actions.extend(MoveToLocation(card) for card in location_cards)
+        if any(diseases.get_location_disease_count(game_state, location, disease_type)
+               for disease_type in range(map_index.n_diseases)):
+            game_actions.append(Heal(''))
+        location_card = locations.get_location_card(game_state, location)
+        if location_card in hand and not locations.has_research_center(game_state, location):
+            game_actions.append(BuildResearchCenter())
+        for other, other_location in zip(game_state.players, game_state.player_locations):
+            if other != player and other_location == location and location_card in hand:
+                game_actions.append(GiveCard(player, other, location_card))
+
+        cards_by_disease = defaultdict(list)
+        for card in location_cards:
+            cards_by_disease[diseases.get_card_disease_type(game_state, card)].append(card)
+        n_cards_to_cure = diseases.get_n_cards_to_cure(game_state, player)
+        for disease_type, disease_cards in cards_by_disease.items():
+            if len(disease_cards) >= n_cards_to_cure and not diseases.disease_is_cured(game_state, disease_type):
+                game_actions.append(CureDisease(*disease_cards[:n_cards_to_cure]))
+        return game_actions
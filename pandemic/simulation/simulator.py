@@ -0,0 +1,113 @@
+import csv
+import os
+import random
+from typing import List, Dict
+
+from pandemic import errors, game
+from pandemic.enums import LocationType, PlayPhases, PlayerRolesEnum
+from pandemic.game import history
+from pandemic.game.maps import MapIndex
+from pandemic.game.setup import new_game_state
+from pandemic.game.state import GameState
+
+POPULATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                             'pandemic_back', 'populates')
+LOCATIONS_CSV = os.path.join(POPULATES_DIR, 'locations.csv')
+CONNECTIONS_CSV = os.path.join(POPULATES_DIR, 'connections.csv')
+STARTING_LOCATION = 'Atlanta'
+DEFAULT_ROLES = (PlayerRolesEnum.medecin.value, PlayerRolesEnum.scientifique.value,
+                 PlayerRolesEnum.specialiste.value, PlayerRolesEnum.expert.value)
+ENDGAME_PHASES = {PlayPhases.victory.value, PlayPhases.defeat.value}
+
+
+class GameResult:
+    __slots__ = ('seed', 'outcome', 'defeat', 'turns', 'actions', 'invalid_actions', 'outbreaks', 'epidemics',
+                 'cured')
+
+    def __init__(self, seed, outcome, defeat, turns, actions, invalid_actions, outbreaks, epidemics, cured):
+        self.seed = seed
+        self.outcome = outcome
+        # cause of the defeat: 'outbreaks' and 'diseases' from the infection reports, 'cards' for an empty deck
+        self.defeat = defeat
+        self.turns = turns
+        self.actions = actions
+        self.invalid_actions = invalid_actions
+        self.outbreaks = outbreaks
+        self.epidemics = epidemics
+        self.cured = cured
+
+    def serialize(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+def read_csv(path):
+    with open(path, newline='') as csvfile:
+        return list(csv.reader(csvfile, delimiter=',', quotechar='|'))
+
+
+def load_map(locations_path=LOCATIONS_CSV, connections_path=CONNECTIONS_CSV) -> MapIndex:
+    # same files and format as pandemic_back/populates/populate.py
+    locations = read_csv(locations_path)
+    return MapIndex({name: LocationType.__members__[loc_type].value for name, loc_type, x, y, population in locations},
+                    read_csv(connections_path),
+                    populations={name: int(population) for name, loc_type, x, y, population in locations},
+                    coordinates={name: (float(x), float(y)) for name, loc_type, x, y, population in locations})
+
+
+def new_game(map_index: MapIndex, seed, roles: List[str] = DEFAULT_ROLES, starting_location=STARTING_LOCATION,
+             **kwargs) -> GameState:
+    players = ['p{}'.format(idx + 1) for idx in range(len(roles))]
+    player_roles: Dict[str, str] = dict(zip(players, roles))
+    return new_game_state(map_index, players, player_roles, starting_location, random.Random(seed), **kwargs)
+
+
+def play_action(game_state, player, game_action) -> bool:
+    # same rollback as Game.register_action, an invalid action leaves the game state untouched
+    game_state.infection_reports = []
+    history.start_journal(game_state, False)
+    try:
+        game_action.apply_to_game_state(player, game_state)
+    except (errors.Victory, errors.Defeat):
+        pass
+    except errors.Error:
+        history.undo(game_state, history.stop_journal(game_state))
+        game_state.dirty = {}
+        return False
+    history.stop_journal(game_state)
+    game_state.dirty = {}
+    return True
+
+
+def run_game(map_index: MapIndex, policy, seed, roles: List[str] = DEFAULT_ROLES, max_actions=10000,
+             max_invalid_actions=100, **kwargs) -> GameResult:
+    game_state = new_game(map_index, seed, roles, **kwargs)
+    # the policy draws from its own generator so that the cards do not depend on the policy choices
+    policy_rng = random.Random('{}-policy'.format(seed))
+    turns = actions = invalid_actions = consecutive_invalid_actions = 0
+    while True:
+        if game_state.phase in ENDGAME_PHASES:
+            outcome = game_state.phase
+            break
+        choice = None
+        if actions < max_actions and consecutive_invalid_actions < max_invalid_actions:
+            choice = policy.choose_action(game_state, policy_rng)
+        if choice is None:
+            outcome = 'unfinished'
+            break
+        player, game_action = choice
+        current_player = game_state.current_player
+        if play_action(game_state, player, game_action):
+            actions += 1
+            consecutive_invalid_actions = 0
+            if game_state.current_player != current_player:
+                turns += 1
+        else:
+            invalid_actions += 1
+            consecutive_invalid_actions += 1
+    defeat = None
+    if outcome == PlayPhases.defeat.value:
+        defeat = next((report.defeat for report in game_state.infection_reports if report.defeat), 'cards')
+    cured = sum(1 for disease_type in range(game_state.map_index.n_diseases)
+                if game.diseases.disease_is_cured(game_state, disease_type))
+    return GameResult(seed, outcome, defeat, turns, actions, invalid_actions, game_state.outbreaks,
+                      game_state.epidemics, cured)
@@ -0,0 +1,208 @@
+import contextlib
+import fcntl
+import json
+import os
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from pandemic import errors
+
+
+class GameStore:
+    # latest state of the started rooms, shared by the worker processes: the state the last
+    # uncancellable command left (base) and the commands played since (tail), behind a version
+    # number bumped by each write. This one keeps every game in its process (a single worker).
+    shared = False
+
+    def __init__(self):
+        self.locks = defaultdict(threading.Lock)
+        self.locks_lock = threading.Lock()
+
+    def room_lock(self, room):
+        with self.locks_lock:
+            return self.locks[room]
+
+    @contextlib.contextmanager
+    def lock(self, room):
+        with self.room_lock(room):
+            yield
+
+    def try_acquire(self, room):
+        return self.room_lock(room).acquire(blocking=False)
+
+    def release(self, room):
+        self.room_lock(room).release()
+
+    def get_version(self, room):
+        return None
+
+    def load(self, room):
+        return None
+
+    def save(self, room, version, base):
+        return None
+
+    def append(self, room, version, entry):
+        return None
+
+
+class MemoryGameStore(GameStore):
+    # stand-in of a shared store in a single process, every game read from it is a new copy
+    shared = True
+
+    def __init__(self):
+        super().__init__()
+        self.records = dict()
+
+    def get_version(self, room):
+        record = self.records.get(room)
+        return record[0] if record else None
+
+    def load(self, room):
+        version, base, tail = self.records[room]
+        return version, json.loads(base), [json.loads(entry) for entry in tail]
+
+    def save(self, room, version, base):
+        check_version(self.get_version(room), version)
+        self.records[room] = (next_version(version), json.dumps(base), [])
+        return self.records[room][0]
+
+    def append(self, room, version, entry):
+        check_version(self.get_version(room), version)
+        _, base, tail = self.records[room]
+        self.records[room] = (next_version(version), base, [*tail, json.dumps(entry)])
+        return self.records[room][0]
+
+
+class FileGameStore(GameStore):
+    # one file per room in a directory shared by the workers of a single machine
+    shared = True
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    @contextlib.contextmanager
+    def lock(self, room):
+        with open(os.path.join(self.path, room + '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self, room):
+        try:
+            with open(os.path.join(self.path, room + '.json')) as record_file:
+                return json.load(record_file)
+        except FileNotFoundError:
+            return None
+
+    def write(self, room, record):
+        path = os.path.join(self.path, room + '.json')
+        with open(path + '.tmp', 'w') as record_file:
+            json.dump(record, record_file)
+        os.replace(path + '.tmp', path)
+        return record['version']
+
+    def get_version(self, room):
+        record = self.read(room)
+        return record['version'] if record else None
+
+    def load(self, room):
+        record = self.read(room)
+        return record['version'], record['base'], record['tail']
+
+    def save(self, room, version, base):
+        check_version(self.get_version(room), version)
+        return self.write(room, {'version': next_version(version), 'base': base, 'tail': []})
+
+    def append(self, room, version, entry):
+        record = self.read(room)
+        check_version(record and record['version'], version)
+        record['version'] = next_version(version)
+        record['tail'].append(entry)
+        return self.write(room, record)
+
+
+class RedisGameStore(GameStore):
+    shared = True
+
+    def __init__(self, url, lock_timeout=10, expire=24 * 3600):
+        import redis
+        super().__init__()
+        self.redis = redis
+        self.client = redis.Redis.from_url(url)
+        self.lock_timeout = lock_timeout
+        self.expire = expire
+
+    @contextlib.contextmanager
+    def lock(self, room):
+        try:
+            with self.client.lock('pandemic:lock:' + room, timeout=self.lock_timeout,
+                                  blocking_timeout=self.lock_timeout):
+                yield
+        except self.redis.exceptions.LockError:
+            raise errors.GameStateConflict
+
+    def get_version(self, room):
+        version = self.client.hget('pandemic:game:' + room, 'version')
+        return int(version) if version is not None else None
+
+    def load(self, room):
+        key = 'pandemic:game:' + room
+        with self.client.pipeline() as pipe:
+            (version, base), tail = pipe.hmget(key, 'version', 'base').lrange(key + ':tail', 0, -1).execute()
+        return int(version), json.loads(base), [json.loads(entry) for entry in tail]
+
+    def write(self, room, version, write):
+        key = 'pandemic:game:' + room
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.watch(key)
+                stored_version = pipe.hget(key, 'version')
+                check_version(int(stored_version) if stored_version is not None else None, version)
+                pipe.multi()
+                pipe.hset(key, 'version', next_version(version))
+                write(pipe, key)
+                pipe.expire(key, self.expire)
+                pipe.expire(key + ':tail', self.expire)
+                pipe.execute()
+        except self.redis.exceptions.WatchError:
+            raise errors.GameStateConflict
+        return next_version(version)
+
+    def save(self, room, version, base):
+        def write(pipe, key):
+            pipe.hset(key, 'base', json.dumps(base))
+            pipe.delete(key + ':tail')
+
+        return self.write(room, version, write)
+
+    def append(self, room, version, entry):
+        return self.write(room, version, lambda pipe, key: pipe.rpush(key + ':tail', json.dumps(entry)))
+
+
+def check_version(stored_version, version):
+    if stored_version != version:
+        raise errors.GameStateConflict
+
+
+def next_version(version):
+    return (version or 0) + 1
+
+
+def open_game_store(url) -> GameStore:
+    # local, memory, file:///shared/directory or redis://host:port
+    scheme = urlparse(url).scheme if '://' in url else url
+    if scheme in ('', 'local'):
+        return GameStore()
+    if scheme == 'memory':
+        return MemoryGameStore()
+    if scheme == 'file':
+        return FileGameStore(urlparse(url).path)
+    if scheme in ('redis', 'rediss'):
+        return RedisGameStore(url)
+    raise ValueError('Unknown game store {}'.format(url))
@@ -0,0 +1,77 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from pandemic import errors
+from pandemic.actors import RoomActor
+from pandemic_back import settings
+
+
+class ChannelLayer:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+
+    async def group_send(self, group, message):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError
+        self.sent.append(json.loads(message['text'])['message'])
+
+
+class RoomActorTest(SimpleTestCase):
+
+    def actor(self, channel_layer, room_name):
+        async def full_state():
+            return {'version': 'full'}
+
+        return RoomActor.get_actor(room_name, 'group_' + room_name, channel_layer, full_state)
+
+    @staticmethod
+    def delta(version, **changes):
+        async def play():
+            return {**changes, 'version': version}
+
+        return play
+
+    def test_batch(self):
+        # the commands waiting together are played in order and broadcast in one message
+        async def main():
+            actor = self.actor(channel_layer, 'batch')
+            futures = [actor.submit(self.delta(1, player_locations={'p1': 'Paris'}), True),
+                       actor.submit(self.delta(2, player_locations={'p2': 'Milan'}), True),
+                       actor.submit(self.delta(3), False)]
+            return await asyncio.gather(*futures)
+
+        channel_layer = ChannelLayer()
+        results = asyncio.run(main())
+        self.assertEqual([result['version'] for result in results], [1, 2, 3])
+        self.assertEqual(channel_layer.sent, [{'player_locations': {'p1': 'Paris', 'p2': 'Milan'}, 'version': 2}])
+        self.assertNotIn('batch', RoomActor.actors)
+
+    def test_broadcast_failure(self):
+        # the callers still get their results and the sockets the whole state
+        async def main():
+            actor = self.actor(channel_layer, 'failure')
+            result = await actor.submit(self.delta(1, phase='end_turn'), True)
+            return result, await actor.submit(self.delta(2, phase='player_action'), True)
+
+        channel_layer = ChannelLayer(failures=3)
+        with self.assertLogs('pandemic.actors', 'ERROR'):
+            results = asyncio.run(main())
+        self.assertEqual([result['version'] for result in results], [1, 2])
+        self.assertEqual(channel_layer.sent, [{'version': 'full'}])
+        self.assertNotIn('failure', RoomActor.stale_rooms)
+
+    def test_room_busy(self):
+        async def main():
+            actor = self.actor(ChannelLayer(), 'busy')
+            futures = [actor.submit(self.delta(1), False), actor.submit(self.delta(2), False)]
+            with self.assertRaises(errors.RoomBusy):
+                actor.submit(self.delta(3), False)
+            await asyncio.gather(*futures)
+
+        with mock.patch.object(settings, 'GAME_ROOM_INBOX', 2):
+            asyncio.run(main())
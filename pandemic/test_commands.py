@@ -0,0 +1,35 @@
+import json
+
+from django.test import SimpleTestCase
+
+from pandemic import errors
+from pandemic.commands import parse_message
+
+
+class CommandSchemaTest(SimpleTestCase):
+
+    def test_slash_and_json_commands(self):
+        self.assertEqual(parse_message(json.dumps('/move Paris')), ('move', ('Paris', '')))
+        self.assertEqual(parse_message(json.dumps({'command': 'move', 'args': {'first': 'Paris'}})),
+                         ('move', ('Paris', '')))
+        self.assertEqual(parse_message(json.dumps('/cure Paris&Milan')), ('cure', (['Paris', 'Milan'],)))
+        self.assertEqual(parse_message(json.dumps('/playevent Nuit Tranquille')),
+                         ('playevent', ('Nuit Tranquille', [])))
+        self.assertEqual(parse_message(json.dumps({'command': 'setnextinfections',
+                                                   'args': {'secret': 'abc', 'cards': ['Paris']}})),
+                         ('setnextinfections', ('abc', ['Paris'])))
+
+    def test_invalid_commands(self):
+        for message in ('not json', json.dumps('/unknown'), json.dumps(['/move Paris']),
+                        json.dumps({'command': 'move', 'args': {'third': 'Paris'}}),
+                        json.dumps({'command': 'move', 'args': {'first': 3}}),
+                        json.dumps({'command': 'join', 'args': {'name': 'x' * 65}}),
+                        json.dumps({'command': 'setnextinfections', 'args': {'secret': 'abc'}}),
+                        json.dumps({'command': 'setnextinfections', 'args': {'secret': 'abc', 'cards': []}}),
+                        json.dumps({'command': 'setnextinfections', 'args': {'secret': 'abc', 'cards': ['']}}),
+                        json.dumps({'command': 'setnextinfections', 'args': {'secret': 'abc', 'cards': ['a'] * 7}}),
+                        json.dumps('/setnextinfections abc|'),
+                        json.dumps('/cure'),
+                        json.dumps('/cure Paris&')):
+            with self.subTest(message=message), self.assertRaises(errors.InvalidCommand):
+                parse_message(message)
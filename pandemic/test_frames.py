@@ -0,0 +1,46 @@
+import json
+
+import msgpack
+from django.test import SimpleTestCase
+
+from pandemic.frames import CompactEncoder, encode_compact_frame, encode_frame, frame_event, join_frames
+from pandemic.simulation import load_map, new_game
+
+
+class FrameTest(SimpleTestCase):
+    map_index = load_map()
+
+    def setUp(self):
+        self.game_state = new_game(self.map_index, seed=1)
+        self.encoder = CompactEncoder.for_map(self.map_index)
+
+    def test_message_encoded_once(self):
+        message = {'type': 'infections', 'cards': ['Paris', 'Milan']}
+        event = frame_event('cardList', message, self.encoder)
+        self.assertEqual(json.loads(event['text']), {'type': 'cardList', 'message': message})
+        self.assertEqual(msgpack.unpackb(event['bytes']), ['cardList', message])
+
+    def test_compact_game_state(self):
+        game_state = self.game_state.serialize()
+        event = frame_event('game_state', game_state, self.encoder)
+        self.assertEqual(json.loads(event['text'])['message'], json.loads(json.dumps(game_state)))
+        msg_type, compact = msgpack.unpackb(event['bytes'])
+        self.assertEqual(msg_type, 'game_state')
+        dictionary = self.encoder.dictionary
+        self.assertEqual({player: dictionary['locations'][location]
+                          for player, location in compact['player_locations'].items()},
+                         game_state['player_locations'])
+        self.assertEqual({player: [dictionary['cards'][card] for card in hand]
+                          for player, hand in compact['player_hands'].items()},
+                         game_state['player_hands'])
+        self.assertLess(len(event['bytes']), len(event['text'].encode()))
+
+    def test_joined_frames(self):
+        # an array of messages, even for a single one
+        messages = [('info', 'Welcome'), ('error', 'Commande invalide !')]
+        for count in (1, 2):
+            self.assertEqual(json.loads(join_frames([encode_frame(*message) for message in messages[:count]])),
+                             [{'type': msg_type, 'message': message} for msg_type, message in messages[:count]])
+            self.assertEqual(msgpack.unpackb(join_frames([encode_compact_frame(*message)
+                                                          for message in messages[:count]])),
+                             [list(message) for message in messages[:count]])
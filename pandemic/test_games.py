@@ -0,0 +1,166 @@
+import random
+from collections import OrderedDict
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase
+
+from pandemic import errors, stores
+from pandemic.controller import gamelog, players, rooms
+from pandemic.flusher import GameFlusher
+from pandemic.game.actions import DumpCard, EndTurn, Heal, Move
+from pandemic.game.rules import Rules
+from pandemic.games import AllGames, Game
+from pandemic.models import GameLogEntry, PlayRoom
+from pandemic_back import settings
+
+
+class GamePersistenceTest(TestCase):
+    # python manage.py test pandemic.test_games
+
+    def setUp(self):
+        for patcher in (mock.patch.object(GameFlusher, 'start'),
+                        mock.patch.object(settings, 'GAME_SNAPSHOT_INTERVAL', 25),
+                        mock.patch.object(AllGames, 'dict_playroom_to_game', OrderedDict()),
+                        mock.patch.object(AllGames, 'store', stores.GameStore())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.playroom = rooms.create_room()
+        self.playroom.seed = 2020
+        self.playroom.save()
+        # nothing left for the flush at exit, once the test database is gone
+        self.addCleanup(GameFlusher.forget, self.playroom)
+        self.players = dict()
+        for name, role in (('alice', 'medecin'), ('bob', 'expert')):
+            player = self.players[name] = players.create_player(name, self.playroom)
+            players.choose_role(player, role)
+            players.ready_player(player)
+        self.rng = random.Random(12)
+
+    def game_state(self):
+        # through AllGames.playing, like the commands: a worker loads the game it does not have yet
+        with AllGames.playing(self.playroom) as game:
+            return game.game_state
+
+    def play(self, turns, before_command=lambda: None):
+        # seeded moves and heals, some cancelled by the other player, then the end of the turn draws cards
+        # and infections from the game rng
+        played = {'cancel': 0, 'end_turn': 0}
+        for _ in range(turns):
+            before_command()
+            game_state = self.game_state()
+            if game_state.phase in ('defeat', 'victory'):
+                break
+            current = game_state.current_player
+            other = next(name for name in self.players if name != current)
+            while game_state.player_actions < Rules.max_actions and game_state.phase == 'player_action':
+                before_command()
+                game_state = self.game_state()
+                location = game_state.player_locations[game_state.players.index(current)]
+                neighbor = game_state.map_index.locations[self.rng.choice(game_state.map_index.neighbors[location])]
+                try:
+                    AllGames.register_action(self.playroom, self.players[current],
+                                             self.rng.choice((Move(neighbor), Move(neighbor), Heal(''))))
+                except errors.Error:
+                    continue
+                if self.rng.random() < 0.3:
+                    before_command()
+                    AllGames.cancel_last_action(self.playroom, self.players[other])
+                    played['cancel'] += 1
+                game_state = self.game_state()
+            while game_state.current_player == current and game_state.phase not in ('defeat', 'victory'):
+                before_command()
+                game_state = self.game_state()
+                action = DumpCard(game_state.player_hands[current][0]) if game_state.phase == 'dump_card' \
+                    else EndTurn()
+                AllGames.register_action(self.playroom, self.players[current], action)
+                played['end_turn'] += isinstance(action, EndTurn)
+                game_state = self.game_state()
+        return played
+
+    def restore(self):
+        game = Game(PlayRoom.objects.get(pk=self.playroom.pk))
+        self.assertTrue(game.restore())
+        return game
+
+    def assertSameGame(self, game, other):
+        self.assertEqual(game.game_state.dump(), other.game_state.dump())
+        self.assertEqual(game.log_index, other.log_index)
+        self.assertEqual(len(game.undo_log), len(other.undo_log))
+
+    def test_restore(self):
+        rooms.start_game(self.playroom)
+        played = self.play(turns=6)
+        self.assertGreater(played['cancel'], 0)
+        self.assertGreater(played['end_turn'], 0)
+        game = AllGames.get_game(self.playroom)
+        self.assertGreater(game.snapshot_index, 0)
+        # restored in the middle of a turn: the tail of the log replays a cancel and rebuilds the undo log
+        game_state = game.game_state
+        player = self.players[game_state.current_player]
+        other = next(name for name in self.players if name != player.name)
+        for _ in range(2):
+            location = game_state.player_locations[game_state.players.index(player.name)]
+            AllGames.register_action(self.playroom, player, Move(game_state.map_index.locations[
+                game_state.map_index.neighbors[location][-1]]))
+        AllGames.cancel_last_action(self.playroom, self.players[other])
+        self.assertEqual(len(game.undo_log), 1)
+        restored = self.restore()
+        self.assertSameGame(game, restored)
+        # the rng is restored too: the same turn draws the same cards and infections
+        for each_game in (game, restored):
+            game_state = each_game.game_state
+            player = self.players[game_state.current_player]
+            while game_state.player_actions < Rules.max_actions:
+                location = game_state.player_locations[game_state.players.index(player.name)]
+                each_game.register_action(player, Move(game_state.map_index.locations[
+                    game_state.map_index.neighbors[location][0]]))
+            each_game.register_action(player, EndTurn())
+        self.assertSameGame(game, restored)
+
+    def move(self, game_state):
+        player = self.players[game_state.current_player]
+        location = game_state.player_locations[game_state.players.index(player.name)]
+        return AllGames.register_action(self.playroom, player, Move(game_state.map_index.locations[
+            game_state.map_index.neighbors[location][0]]))
+
+    def test_log_written_after_failure(self):
+        rooms.start_game(self.playroom)
+        game = AllGames.get_game(self.playroom)
+        with mock.patch.object(gamelog, 'append_log_entries', side_effect=DatabaseError), \
+                self.assertLogs('pandemic.games', 'ERROR'):
+            self.assertIn('player_locations', self.move(game.game_state))
+        self.assertEqual(len(game.unwritten_entries), 1)
+        self.move(game.game_state)
+        self.assertEqual(list(GameLogEntry.objects.filter(playroom=self.playroom).values_list('index', flat=True)),
+                         [0, 1])
+        self.assertSameGame(game, self.restore())
+
+    def test_incomplete_log(self):
+        rooms.start_game(self.playroom)
+        game = AllGames.get_game(self.playroom)
+        for _ in range(3):
+            self.move(game.game_state)
+        GameLogEntry.objects.filter(playroom=self.playroom, index=1).delete()
+        with self.assertRaises(errors.GameLogIncomplete):
+            self.restore()
+
+    def test_sync_between_workers(self):
+        # the commands are played on either worker, each one loads the changes of the other from the store
+        AllGames.store = stores.MemoryGameStore()
+        workers = [AllGames.dict_playroom_to_game, OrderedDict()]
+
+        def switch_worker():
+            AllGames.dict_playroom_to_game = workers[self.rng.random() < 0.5]
+
+        rooms.start_game(self.playroom)
+        played = self.play(turns=6, before_command=switch_worker)
+        self.assertGreater(played['cancel'], 0)
+        games = []
+        for worker in workers:
+            AllGames.dict_playroom_to_game = worker
+            AllGames.get_game_state(self.playroom)
+            games.append(AllGames.get_game(self.playroom))
+        self.assertIsNot(games[0], games[1])
+        self.assertSameGame(games[0], games[1])
+        self.assertSameGame(games[0], self.restore())
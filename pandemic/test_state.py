@@ -0,0 +1,135 @@
+import copy
+import random
+
+from django.test import SimpleTestCase
+
+from pandemic import errors
+from pandemic.enums import CardEvent
+from pandemic.game import diseases, history, infections
+from pandemic.game.state import GameState
+from pandemic.game.actions import Subvention
+from pandemic.simulation import RandomPolicy, load_map, new_game, play_action
+
+
+class GameStateTest(SimpleTestCase):
+    # rules engine only, without any database: python manage.py test pandemic.test_state
+    map_index = load_map()
+
+    def setUp(self):
+        self.game_state = new_game(self.map_index, seed=1)
+        self.player = self.game_state.current_player
+
+    @staticmethod
+    def client_state(state):
+        # what a client shows, whatever the order of the items and the cells left at 0
+        return {
+            **state,
+            'locations_disease_count': sorted((item['location'], disease['type'], disease['count'])
+                                              for item in state['locations_disease_count']
+                                              for disease in item['diseases'] if disease['count']),
+            'locations_research_center': sorted(location for location, has_center
+                                                in state['locations_research_center'].items() if has_center),
+            'disease_status': sorted((disease['type'], disease['count'], disease['status'])
+                                     for disease in state['disease_status']),
+        }
+
+    def give_card(self, card):
+        self.game_state.player_hands[self.player].append(card)
+
+    def test_research_center_count(self):
+        start = self.game_state.player_locations[0]
+        for location in (self.map_index.locations[start], 'Paris', 'Paris'):
+            self.give_card(CardEvent.subvention.value)
+            self.assertTrue(play_action(self.game_state, self.player, Subvention(location)))
+            self.assertEqual(self.game_state.research_center_count,
+                             bin(self.game_state.locations_research_center).count('1'))
+        self.assertEqual(self.game_state.research_center_count, 2)
+
+    def test_snapshot(self):
+        # the snapshot written to the game log is not changed by the commands played after it
+        policy = RandomPolicy()
+        rng = random.Random(5)
+        snapshot = self.game_state.snapshot()
+        # dump shares the lists of the game state
+        before = copy.deepcopy(self.game_state.dump())
+        self.assertEqual(snapshot.dump(), before)
+        for _ in range(50):
+            if self.game_state.phase in ('victory', 'defeat'):
+                break
+            play_action(self.game_state, *policy.choose_action(self.game_state, rng))
+        self.assertNotEqual(self.game_state.dump(), before)
+        self.assertEqual(snapshot.dump(), before)
+
+    def test_undo(self):
+        # every action of a random game is undone from its journal, then played for good
+        policy = RandomPolicy()
+        rng = random.Random(3)
+        for _ in range(300):
+            if self.game_state.phase in ('victory', 'defeat'):
+                break
+            player, action = policy.choose_action(self.game_state, rng)
+            before = self.game_state.dump()
+            # as Game._register_action
+            cancellable = self.game_state.cancellable
+            history.start_journal(self.game_state, True)
+            try:
+                action.apply_to_game_state(player, self.game_state)
+            except errors.Error:
+                pass
+            history.undo(self.game_state, history.stop_journal(self.game_state))
+            self.game_state.cancellable = cancellable
+            self.assertEqual(self.game_state.dump(), before)
+            play_action(self.game_state, player, action)
+
+    def test_deltas(self):
+        # a client applying the deltas of every command, or of a whole turn merged, has the full state
+        policy = RandomPolicy()
+        rng = random.Random(5)
+        self.game_state.serialize_delta()
+        client = turn_start = self.game_state.serialize()
+        deltas = []
+        for _ in range(300):
+            if self.game_state.phase in ('victory', 'defeat'):
+                break
+            current_player = self.game_state.current_player
+            self.game_state.infection_reports = []
+            player, action = policy.choose_action(self.game_state, rng)
+            history.start_journal(self.game_state, False)
+            try:
+                action.apply_to_game_state(player, self.game_state)
+            except errors.Error:
+                history.undo(self.game_state, history.stop_journal(self.game_state))
+            else:
+                history.stop_journal(self.game_state)
+            delta = self.game_state.serialize_delta()
+            delta.pop('infections', None)
+            deltas.append(delta)
+            client = GameState.merge_deltas([client, delta])
+            self.assertEqual(self.client_state(client), self.client_state(self.game_state.serialize()))
+            if self.game_state.current_player != current_player:
+                merged = GameState.merge_deltas([turn_start, GameState.merge_deltas(deltas)])
+                self.assertEqual(self.client_state(merged), self.client_state(client))
+                turn_start, deltas = client, []
+
+    def test_outbreak_cascade(self):
+        # a chain of two outbreaks: each city infects its neighbors once and is not infected again
+        map_index = self.map_index
+        self.game_state.locations_disease_count = bytearray(map_index.n_locations * map_index.n_diseases)
+        first = map_index.location_id('Atlanta')
+        second = map_index.neighbors[first][0]
+        protected = next(location for location in map_index.neighbors[second]
+                         if location != first and location not in map_index.neighbors[first])
+        disease_type = map_index.locations_types[first]
+        for location in (first, second):
+            diseases.set_location_disease_count(self.game_state, location, disease_type, 3)
+        report = infections.cascade(self.game_state, [first], visited=1 << protected)
+        self.assertEqual(report.outbreaks, [first, second])
+        self.assertEqual(self.game_state.outbreaks, 2)
+        self.assertIsNone(report.defeat)
+        expected = {first: 3, second: 3}
+        for location in range(map_index.n_locations):
+            if location not in expected and location != protected:
+                expected[location] = sum(location in map_index.neighbors[outbreak] for outbreak in (first, second))
+        self.assertEqual({location: diseases.get_location_disease_count(self.game_state, location, disease_type)
+                          for location in range(map_index.n_locations)}, {**expected, protected: 0})
+        self.assertEqual(sum(report.cubes.values()), sum(expected.values()) - 6)
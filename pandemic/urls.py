@@ -4,5 +4,6 @@ from . import views
 
 urlpatterns = [
     path('', views.poll, name='poll'),
+    path('metrics', views.metrics, name='metrics'),
 
 ]
\ No newline at end of file
@@ -1,6 +1,13 @@
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from pandemic.games import AllGames
+
 
 # Create your views here.
 def poll(request):
     print('polling')
+
+
+def metrics(request):
+    return JsonResponse(AllGames.get_metrics())
@@ -14,3 +14,7 @@ from channels.routing import get_default_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pandemic_back.settings")
 django.setup()
 application = get_default_application()
+
+from pandemic.games import AllGames  # noqa: E402
+
+AllGames.warm_up_in_background()
@@ -150,3 +150,30 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = (
     os.path.join(BASE_DIR, 'pandemic/static'),
 )
+
+# Game persistence: every accepted command is appended to the room log,
+# a snapshot of the game state is written every GAME_SNAPSHOT_INTERVAL commands
+GAME_SNAPSHOT_INTERVAL = int(os.environ.get('GAME_SNAPSHOT_INTERVAL', 50))
+# the database rows of the running games are written behind, every GAME_FLUSH_INTERVAL seconds
+# and at the end of each turn (0: only at the end of each turn)
+GAME_FLUSH_INTERVAL = float(os.environ.get('GAME_FLUSH_INTERVAL', 5))
+# number of the last played rooms loaded in the background when a server starts
+GAME_WARM_UP_ROOMS = int(os.environ.get('GAME_WARM_UP_ROOMS', 20))
+# where the workers share the started games: local (a single worker), memory, file:///shared/directory
+# or redis://host:port
+GAME_STORE = os.environ.get('GAME_STORE', 'local')
+# rooms kept in memory by each worker, the least recently played ones are evicted first,
+# and any room idle for GAME_ROOM_TTL seconds
+GAME_MAX_ROOMS = int(os.environ.get('GAME_MAX_ROOMS', 500))
+GAME_ROOM_TTL = float(os.environ.get('GAME_ROOM_TTL', 2 * 3600))
+# commands waiting to be played in a room before new ones are refused, and how many of the waiting
+# commands are played together with their game changes broadcast in a single message (1: no batching)
+GAME_ROOM_INBOX = int(os.environ.get('GAME_ROOM_INBOX', 64))
+GAME_ROOM_BATCH = int(os.environ.get('GAME_ROOM_BATCH', 16))
+# errors of the rooms (broadcasts, log writes) on the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'pandemic': {'handlers': ['console'], 'level': os.environ.get('PANDEMIC_LOG_LEVEL', 'INFO')}},
+}